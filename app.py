@@ -6,31 +6,49 @@ Provides REST API and web interface
 
 import os
 import json
-import threading
-import time
+import functools
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import numpy as np
 import pyaudio
-import schedule
+from apscheduler.schedulers.background import BackgroundScheduler
 
 from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    print("Warning: orjson not installed, using the standard JSON encoder. Install with: pip install orjson")
+    orjson = None
+
 from led_controller import LEDController, PatternType, ColorRGB
 
 # Load environment variables
 load_dotenv()
 
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (also serializes numpy arrays)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if orjson:
+    app.json = ORJSONProvider(app)
 CORS(app)
 
 # Global LED controller instance
 led_controller = None
 audio_stream = None
-audio_thread = None
-scheduler_thread = None
+scheduler = BackgroundScheduler()
 
 # Configuration
 LED_COUNT = int(os.getenv('LED_COUNT', 60))
@@ -43,9 +61,49 @@ AUDIO_FORMAT = pyaudio.paInt16
 AUDIO_CHANNELS = 1
 AUDIO_RATE = 44100
 
+# Two audio chunk buffers the stream callback alternates between, so the
+# animation thread never reads the buffer currently being overwritten
+audio_buffers = np.zeros((2, AUDIO_CHUNK_SIZE), dtype=np.int16)
+audio_buffer_index = 0
+
 # Scheduled patterns storage
 scheduled_patterns = []
 
+# Pattern lookup by name, for O(1) request validation and conversion
+PATTERNS = {p.value: p for p in PatternType}
+
+
+# Slider drags resend the same colors, so hex parsing is memoized
+@functools.lru_cache(maxsize=256)
+def _hex_to_rgb(hex_color: str):
+    """Cached (r, g, b) for a hex color; tuples are immutable, ColorRGB is not"""
+    return ColorRGB.from_hex(hex_color).to_tuple()
+
+
+def color_from_hex(hex_color: str) -> ColorRGB:
+    """Parse a hex color into a fresh ColorRGB, reusing cached parses"""
+    return ColorRGB(*_hex_to_rgb(hex_color))
+
+
+# Static presets, serialized once for /api/presets
+PRESETS = {
+    "patterns": [p.value for p in PatternType],
+    "colors": {
+        "red": "#FF0000",
+        "green": "#00FF00",
+        "blue": "#0000FF",
+        "yellow": "#FFFF00",
+        "purple": "#800080",
+        "orange": "#FFA500",
+        "pink": "#FFC0CB",
+        "cyan": "#00FFFF"
+    }
+}
+PRESETS_JSON = app.json.dumps(PRESETS)
+
+# Rendered index page, cached on first request (the template is static)
+index_html = None
+
 
 def init_led_controller():
     """Initialize the LED controller"""
@@ -65,67 +123,67 @@ def init_led_controller():
 
 def start_audio_capture():
     """Start audio capture for music visualization"""
-    global audio_stream, audio_thread
+    global audio_stream
     
-    if audio_thread and audio_thread.is_alive():
+    if audio_stream and audio_stream.is_active():
         return
     
-    def audio_worker():
-        global audio_stream
+    def audio_callback(in_data, frame_count, time_info, status):
+        global audio_buffer_index
         try:
-            p = pyaudio.PyAudio()
-            audio_stream = p.open(
-                format=AUDIO_FORMAT,
-                channels=AUDIO_CHANNELS,
-                rate=AUDIO_RATE,
-                input=True,
-                frames_per_buffer=AUDIO_CHUNK_SIZE
-            )
+            # Fill the buffer the LED controller is not holding, then hand it over
+            audio_buffer_index ^= 1
+            audio_buffer = audio_buffers[audio_buffer_index]
+            np.copyto(audio_buffer, np.frombuffer(in_data, dtype=np.int16))
             
-            while True:
-                try:
-                    data = audio_stream.read(AUDIO_CHUNK_SIZE, exception_on_overflow=False)
-                    audio_data = np.frombuffer(data, dtype=np.int16)
-                    
-                    # Process audio data for visualization
-                    if led_controller:
-                        led_controller.set_audio_data(audio_data)
-                        
-                except Exception as e:
-                    print(f"Audio capture error: {e}")
-                    break
-                    
+            # Process audio data for visualization
+            if led_controller:
+                led_controller.set_audio_data(audio_buffer)
+                
         except Exception as e:
-            print(f"Failed to start audio capture: {e}")
-        finally:
-            if audio_stream:
-                audio_stream.stop_stream()
-                audio_stream.close()
+            print(f"Audio capture error: {e}")
+        
+        return (None, pyaudio.paContinue)
     
-    audio_thread = threading.Thread(target=audio_worker, daemon=True)
-    audio_thread.start()
+    try:
+        # PortAudio calls audio_callback on its own thread for every chunk
+        p = pyaudio.PyAudio()
+        audio_stream = p.open(
+            format=AUDIO_FORMAT,
+            channels=AUDIO_CHANNELS,
+            rate=AUDIO_RATE,
+            input=True,
+            frames_per_buffer=AUDIO_CHUNK_SIZE,
+            stream_callback=audio_callback
+        )
+        audio_stream.start_stream()
+        
+    except Exception as e:
+        print(f"Failed to start audio capture: {e}")
 
 
 def start_scheduler():
     """Start the pattern scheduler"""
-    global scheduler_thread
-    
-    if scheduler_thread and scheduler_thread.is_alive():
-        return
-    
-    def scheduler_worker():
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
-    
-    scheduler_thread = threading.Thread(target=scheduler_worker, daemon=True)
-    scheduler_thread.start()
+    if not scheduler.running:
+        scheduler.start()
+
+
+def _body() -> dict:
+    """Parse the request JSON body, returning {} if missing or not an object"""
+    data = request.get_json(silent=True, cache=False)
+    return data if isinstance(data, dict) else {}
 
 
 @app.route('/')
 def index():
     """Serve the main web interface"""
-    return render_template('index.html')
+    global index_html
+    
+    # url_for in the template needs a request context, so render lazily
+    if index_html is None:
+        index_html = render_template('index.html')
+    
+    return app.response_class(index_html, mimetype='text/html')
 
 
 @app.route('/api/status')
@@ -144,13 +202,13 @@ def set_pattern():
         return jsonify({"error": "LED controller not initialized"}), 500
     
     try:
-        data = request.get_json()
+        data = _body()
         pattern_name = data.get('pattern')
         
-        if pattern_name not in [p.value for p in PatternType]:
+        pattern = PATTERNS.get(pattern_name)
+        if pattern is None:
             return jsonify({"error": "Invalid pattern"}), 400
         
-        pattern = PatternType(pattern_name)
         led_controller.set_pattern(pattern)
         
         return jsonify({"success": True, "pattern": pattern_name})
@@ -166,12 +224,12 @@ def set_color():
         return jsonify({"error": "LED controller not initialized"}), 500
     
     try:
-        data = request.get_json()
+        data = _body()
         
         if 'primary' in data:
             color_data = data['primary']
             if 'hex' in color_data:
-                color = ColorRGB.from_hex(color_data['hex'])
+                color = color_from_hex(color_data['hex'])
             else:
                 color = ColorRGB(
                     color_data.get('red', 255),
@@ -183,7 +241,7 @@ def set_color():
         if 'secondary' in data:
             color_data = data['secondary']
             if 'hex' in color_data:
-                color = ColorRGB.from_hex(color_data['hex'])
+                color = color_from_hex(color_data['hex'])
             else:
                 color = ColorRGB(
                     color_data.get('red', 0),
@@ -205,7 +263,7 @@ def set_brightness():
         return jsonify({"error": "LED controller not initialized"}), 500
     
     try:
-        data = request.get_json()
+        data = _body()
         brightness = data.get('brightness', 128)
         
         if not isinstance(brightness, int) or brightness < 0 or brightness > 255:
@@ -225,7 +283,7 @@ def set_speed():
         return jsonify({"error": "LED controller not initialized"}), 500
     
     try:
-        data = request.get_json()
+        data = _body()
         speed = data.get('speed', 1.0)
         
         if not isinstance(speed, (int, float)) or speed < 0.1 or speed > 10.0:
@@ -311,13 +369,14 @@ def stop_audio():
 def schedule_pattern():
     """Schedule a pattern to run at a specific time"""
     try:
-        data = request.get_json()
+        data = _body()
         
         pattern_name = data.get('pattern')
         time_str = data.get('time')  # Format: "HH:MM"
         duration = data.get('duration', 60)  # Duration in minutes
         
-        if pattern_name not in [p.value for p in PatternType]:
+        pattern = PATTERNS.get(pattern_name)
+        if pattern is None:
             return jsonify({"error": "Invalid pattern"}), 400
         
         # Parse time
@@ -328,22 +387,26 @@ def schedule_pattern():
         except ValueError:
             return jsonify({"error": "Invalid time format. Use HH:MM"}), 400
         
+        entry = {
+            "pattern": pattern_name,
+            "time": time_str,
+            "duration": duration,
+            "created": datetime.now().isoformat()
+        }
+        
         # Schedule the pattern
         def run_scheduled_pattern():
             if led_controller:
-                led_controller.set_pattern(PatternType(pattern_name))
+                led_controller.set_pattern(pattern)
                 led_controller.start_animation()
-                time.sleep(duration * 60)  # Convert to seconds
-                led_controller.stop_animation()
+                stop_job = scheduler.add_job(led_controller.stop_animation, 'date',
+                                             run_date=datetime.now() + timedelta(minutes=duration))
+                entry["stop_job_id"] = stop_job.id
         
-        schedule.every().day.at(time_str).do(run_scheduled_pattern)
-        
-        scheduled_patterns.append({
-            "pattern": pattern_name,
-            "time": time_str,
-            "duration": duration,
-            "created": datetime.now().isoformat()
-        })
+        # Job ids are kept on the entry so deleting it can cancel both jobs
+        entry["job_id"] = scheduler.add_job(run_scheduled_pattern, 'cron',
+                                            hour=hour, minute=minute).id
+        scheduled_patterns.append(entry)
         
         return jsonify({"success": True, "scheduled": len(scheduled_patterns)})
     
@@ -362,7 +425,11 @@ def delete_scheduled_pattern(index):
     """Delete a scheduled pattern"""
     try:
         if 0 <= index < len(scheduled_patterns):
-            del scheduled_patterns[index]
+            entry = scheduled_patterns.pop(index)
+            # The stop job only exists while a scheduled run is in progress
+            for job_id in (entry.get("job_id"), entry.get("stop_job_id")):
+                if job_id and scheduler.get_job(job_id):
+                    scheduler.remove_job(job_id)
             return jsonify({"success": True})
         else:
             return jsonify({"error": "Invalid pattern index"}), 400
@@ -374,20 +441,7 @@ def delete_scheduled_pattern(index):
 @app.route('/api/presets', methods=['GET'])
 def get_presets():
     """Get available pattern presets"""
-    presets = {
-        "patterns": [p.value for p in PatternType],
-        "colors": {
-            "red": "#FF0000",
-            "green": "#00FF00",
-            "blue": "#0000FF",
-            "yellow": "#FFFF00",
-            "purple": "#800080",
-            "orange": "#FFA500",
-            "pink": "#FFC0CB",
-            "cyan": "#00FFFF"
-        }
-    }
-    return jsonify(presets)
+    return app.response_class(PRESETS_JSON, mimetype='application/json')
 
 
 @app.route('/api/export', methods=['GET'])
@@ -411,7 +465,7 @@ def export_settings():
 def import_settings():
     """Import settings from JSON"""
     try:
-        data = request.get_json()
+        data = _body()
         
         # Apply settings
         if 'status' in data:
@@ -450,6 +504,9 @@ def cleanup():
     """Cleanup resources on shutdown"""
     global led_controller, audio_stream
     
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    
     if led_controller:
         led_controller.cleanup()
     
@@ -10,6 +10,7 @@ import threading
 import time
 from typing import Optional, Callable
 from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
 import scipy.fft as fft
 
 
@@ -35,8 +36,13 @@ class AudioProcessor:
         self.audio_thread = None
         
         # Audio processing buffers
-        self.audio_buffer = deque(maxlen=10)  # Keep last 10 chunks
-        self.fft_buffer = deque(maxlen=5)     # Keep last 5 FFT results
+        # Fixed ring buffers: one row per chunk, head is the next row to write
+        self.audio_buffer = np.zeros((10, chunk_size), dtype=np.int16)  # Keep last 10 chunks
+        self.audio_head = 0
+        self.fft_buffer = np.zeros((5, chunk_size // 2 + 1), dtype=np.float32)  # Keep last 5 FFT results
+        self.fft_head = 0
+        self.fft_count = 0
+        self._energies = np.zeros(len(self.fft_buffer), dtype=np.float32)  # Energy of each FFT row
         
         # Visualization data
         self.frequency_bins = None
@@ -49,6 +55,31 @@ class AudioProcessor:
         self.visualization_callback = None
         self.beat_callback = None
         
+        # Precomputed FFT constants (chunk size never changes)
+        self._window = np.hanning(chunk_size).astype(np.float32)
+        self._freqs = fft.rfftfreq(chunk_size, 1 / sample_rate)
+        self._inv_32768 = np.float32(1.0 / 32768.0)
+        
+        # Previous and current chunk of normalized samples; the STFT frames
+        # are 50%-overlapping views into it, so each chunk yields two frames
+        self._hop = chunk_size // 2
+        self._history = np.zeros(2 * chunk_size, dtype=np.float32)
+        self._frames = sliding_window_view(self._history, chunk_size)[self._hop::self._hop]
+        
+        # Work buffers for the windowed frames and their power spectra
+        self._windowed = np.empty(self._frames.shape, dtype=np.float32)
+        self._frame_power = np.empty((len(self._frames), chunk_size // 2 + 1), dtype=np.float32)
+        
+        # Reused visualization output (overwritten on every audio callback)
+        self._led_data = np.zeros(led_count, dtype=np.float32)
+        self._visualization_data = {
+            'led_data': self._led_data,
+            'bass_intensity': 0.0,
+            'treble_intensity': 0.0,
+            'beat_detected': False,
+            'overall_amplitude': 0.0
+        }
+        
         # Initialize frequency bins for LED mapping
         self._init_frequency_bins()
     
@@ -62,9 +93,32 @@ class AudioProcessor:
             'high_mid': (2000, 4000), # 2000-4000 Hz
             'treble': (4000, 8000) # 4000-8000 Hz
         }
+        
+        # Contiguous FFT bin slices for each range (inclusive upper bound)
+        self._bin_slices = {
+            name: slice(np.searchsorted(self._freqs, low, side='left'),
+                        np.searchsorted(self._freqs, high, side='right'))
+            for name, (low, high) in self.frequency_bins.items()
+        }
+        
+        # Logarithmic LED bands as FFT bin boundaries for np.add.reduceat
+        led_edges = np.logspace(np.log10(20), np.log10(8000), self.led_count + 1)
+        band_idx = np.searchsorted(self._freqs, led_edges, side='left')
+        band_counts = np.diff(band_idx)
+        self._led_band_empty = band_counts == 0
+        self._led_band_counts = np.maximum(band_counts, 1).astype(np.float32)
+        # reduceat needs the closing boundary too, which can be len(freqs);
+        # the spectrum is reduced from a copy with one trailing zero so that
+        # boundary stays a valid index and the top bin is still summed
+        self._led_band_idx = band_idx
+        self._padded_power = np.zeros(len(self._freqs) + 1, dtype=np.float32)
     
     def set_visualization_callback(self, callback: Callable):
-        """Set callback for visualization data"""
+        """Set callback for visualization data
+        
+        The data dict and its led_data array are reused between callbacks;
+        copy them if they need to outlive the call.
+        """
         self.visualization_callback = callback
     
     def set_beat_callback(self, callback: Callable):
@@ -117,9 +171,13 @@ class AudioProcessor:
         try:
             # Convert audio data to numpy array
             audio_data = np.frombuffer(in_data, dtype=np.int16)
+            if self.channels > 1:
+                # Interleaved frames: downmix to mono so buffers stay chunk_size long
+                audio_data = audio_data.reshape(-1, self.channels).mean(axis=1).astype(np.int16)
             
             # Add to buffer
-            self.audio_buffer.append(audio_data)
+            self.audio_buffer[self.audio_head] = audio_data
+            self.audio_head = (self.audio_head + 1) % len(self.audio_buffer)
             
             # Process audio for visualization
             self._process_audio(audio_data)
@@ -132,30 +190,43 @@ class AudioProcessor:
     def _process_audio(self, audio_data: np.ndarray):
         """Process audio data for visualization"""
         try:
-            # Convert to float and normalize
-            audio_float = audio_data.astype(np.float32) / 32768.0
+            # Shift in the new chunk, converted to float and normalized
+            history = self._history
+            history[:self.chunk_size] = history[self.chunk_size:]
+            np.multiply(audio_data, self._inv_32768, out=history[self.chunk_size:])
             
             # Apply window function to reduce spectral leakage
-            windowed = audio_float * np.hanning(len(audio_float))
+            windowed = np.multiply(self._frames, self._window, out=self._windowed)
+            
+            # Compute all overlapping frames in one batched FFT, letting
+            # pocketfft spread the frames over all cores
+            # (real input, so only the non-negative half is needed)
+            spectrum = fft.rfft(windowed, axis=1, workers=-1)
             
-            # Compute FFT
-            fft_data = fft.fft(windowed)
-            fft_magnitude = np.abs(fft_data[:len(fft_data)//2])
+            # Power spectrum averaged over the frames; square roots are
+            # taken only on reduced values
+            frame_power = np.square(spectrum.real, out=self._frame_power)
+            frame_power += np.square(spectrum.imag)
             
-            # Add to FFT buffer
-            self.fft_buffer.append(fft_magnitude)
+            # Average straight into the FFT ring buffer
+            head = self.fft_head
+            fft_power = np.mean(frame_power, axis=0, out=self.fft_buffer[head])
             
-            # Calculate frequency bins
-            freqs = fft.fftfreq(len(fft_data), 1/self.sample_rate)[:len(fft_data)//2]
+            # Total spectral energy, shared by beat detection and amplitude
+            energy = float(fft_power.sum())
+            self._energies[head] = energy
+            
+            self.fft_head = (head + 1) % len(self.fft_buffer)
+            self.fft_count = min(self.fft_count + 1, len(self.fft_buffer))
             
             # Extract frequency ranges
-            self._extract_frequency_ranges(fft_magnitude, freqs)
+            self._extract_frequency_ranges(fft_power)
             
             # Detect beats
-            self._detect_beats(fft_magnitude)
+            self._detect_beats(energy)
             
             # Create visualization data
-            visualization_data = self._create_visualization_data(fft_magnitude, freqs)
+            visualization_data = self._create_visualization_data(fft_power, energy)
             
             # Call visualization callback
             if self.visualization_callback:
@@ -164,76 +235,66 @@ class AudioProcessor:
         except Exception as e:
             print(f"Audio processing error: {e}")
     
-    def _extract_frequency_ranges(self, fft_magnitude: np.ndarray, freqs: np.ndarray):
-        """Extract intensity for different frequency ranges"""
+    def _extract_frequency_ranges(self, fft_power: np.ndarray):
+        """Extract RMS magnitude for different frequency ranges"""
         try:
             # Bass (0-250 Hz)
-            bass_mask = (freqs >= 0) & (freqs <= 250)
-            self.bass_intensity = np.mean(fft_magnitude[bass_mask]) if np.any(bass_mask) else 0.0
+            bass = fft_power[self._bin_slices['bass']]
+            self.bass_intensity = np.sqrt(bass.mean()) if bass.size else 0.0
             
             # Treble (4000-8000 Hz)
-            treble_mask = (freqs >= 4000) & (freqs <= 8000)
-            self.treble_intensity = np.mean(fft_magnitude[treble_mask]) if np.any(treble_mask) else 0.0
+            treble = fft_power[self._bin_slices['treble']]
+            self.treble_intensity = np.sqrt(treble.mean()) if treble.size else 0.0
             
         except Exception as e:
             print(f"Frequency extraction error: {e}")
     
-    def _detect_beats(self, fft_magnitude: np.ndarray):
+    def _detect_beats(self, current_energy: float):
         """Simple beat detection using energy analysis"""
         try:
-            if len(self.fft_buffer) < 3:
+            if self.fft_count < 3:
                 return
             
-            # Calculate energy
-            current_energy = np.sum(fft_magnitude)
-            
             # Get previous energies
-            prev_energies = [np.sum(fft) for fft in list(self.fft_buffer)[-3:-1]]
+            size = len(self._energies)
+            avg_prev_energy = 0.5 * (self._energies[(self.fft_head - 2) % size] +
+                                     self._energies[(self.fft_head - 3) % size])
             
-            if len(prev_energies) >= 2:
-                avg_prev_energy = np.mean(prev_energies)
-                
-                # Beat detected if current energy is significantly higher
-                if current_energy > avg_prev_energy * 1.3:
-                    self.beat_detection = True
-                    if self.beat_callback:
-                        self.beat_callback()
-                else:
-                    self.beat_detection = False
+            # Beat detected if current energy is significantly higher
+            # (1.3x in magnitude, squared since energy sums power)
+            if current_energy > avg_prev_energy * 1.69:
+                self.beat_detection = True
+                if self.beat_callback:
+                    self.beat_callback()
+            else:
+                self.beat_detection = False
                     
         except Exception as e:
             print(f"Beat detection error: {e}")
     
-    def _create_visualization_data(self, fft_magnitude: np.ndarray, freqs: np.ndarray) -> dict:
+    def _create_visualization_data(self, fft_power: np.ndarray, energy: float) -> dict:
         """Create visualization data for LEDs"""
         try:
-            # Map frequency bins to LED positions
-            led_data = np.zeros(self.led_count)
-            
-            # Create frequency bands for LED mapping
-            freq_bands = np.logspace(np.log10(20), np.log10(8000), self.led_count + 1)
-            
-            for i in range(self.led_count):
-                # Find frequencies in this band
-                band_mask = (freqs >= freq_bands[i]) & (freqs < freq_bands[i + 1])
-                
-                if np.any(band_mask):
-                    # Average magnitude in this frequency band
-                    led_data[i] = np.mean(fft_magnitude[band_mask])
-                else:
-                    led_data[i] = 0.0
+            # Average magnitude in each LED's frequency band in one reduction
+            led_data = self._led_data
+            padded = self._padded_power
+            padded[:-1] = fft_power
+            band_sums = np.add.reduceat(padded, self._led_band_idx)[:-1]
+            np.divide(band_sums, self._led_band_counts, out=led_data)
+            led_data[self._led_band_empty] = 0.0
+            np.sqrt(led_data, out=led_data)
             
             # Normalize data
-            if np.max(led_data) > 0:
-                led_data = led_data / np.max(led_data)
+            peak = led_data.max()
+            if peak > 0:
+                led_data /= peak
             
-            return {
-                'led_data': led_data,
-                'bass_intensity': self.bass_intensity,
-                'treble_intensity': self.treble_intensity,
-                'beat_detected': self.beat_detection,
-                'overall_amplitude': np.mean(fft_magnitude)
-            }
+            data = self._visualization_data
+            data['bass_intensity'] = self.bass_intensity
+            data['treble_intensity'] = self.treble_intensity
+            data['beat_detected'] = self.beat_detection
+            data['overall_amplitude'] = np.sqrt(energy / fft_power.size)
+            return data
             
         except Exception as e:
             print(f"Visualization data creation error: {e}")
@@ -247,7 +308,7 @@ class AudioProcessor:
     
     def get_audio_levels(self) -> dict:
         """Get current audio levels for display"""
-        if not self.fft_buffer:
+        if not self.fft_count:
             return {
                 'bass': 0.0,
                 'treble': 0.0,
@@ -255,12 +316,12 @@ class AudioProcessor:
                 'beat': False
             }
         
-        latest_fft = list(self.fft_buffer)[-1]
+        latest_fft = self.fft_buffer[(self.fft_head - 1) % len(self.fft_buffer)]
         
         return {
             'bass': float(self.bass_intensity),
             'treble': float(self.treble_intensity),
-            'overall': float(np.mean(latest_fft)),
+            'overall': float(np.sqrt(np.mean(latest_fft))),
             'beat': self.beat_detection
         }
     
@@ -276,6 +337,8 @@ class MusicVisualizer:
         self.led_count = led_count
         self.beat_history = deque(maxlen=20)
         self.energy_history = deque(maxlen=50)
+        # (kernel, edge counts) for each (window_size, data length) smoothed so far
+        self._smoothing = {}
     
     def spectrum_visualization(self, audio_data: dict) -> np.ndarray:
         """Create spectrum visualization from audio data"""
@@ -284,17 +347,12 @@ class MusicVisualizer:
         # Apply smoothing
         smoothed = self._smooth_data(led_data)
         
-        # Convert to RGB values
+        # Map intensity to color: high intensity red, low intensity blue
+        high = smoothed > 0.5
         colors = np.zeros((self.led_count, 3))
-        
-        for i, intensity in enumerate(smoothed):
-            # Map intensity to color (blue to red)
-            if intensity > 0.5:
-                # High intensity - red
-                colors[i] = [intensity * 255, (1 - intensity) * 255, 0]
-            else:
-                # Low intensity - blue
-                colors[i] = [0, 0, intensity * 255]
+        colors[:, 0] = np.where(high, smoothed * 255, 0)
+        colors[:, 1] = np.where(high, (1 - smoothed) * 255, 0)
+        colors[:, 2] = np.where(high, 0, smoothed * 255)
         
         return colors
     
@@ -322,23 +380,17 @@ class MusicVisualizer:
         # Group LEDs into frequency bars
         bars = 8  # Number of frequency bars
         leds_per_bar = self.led_count // bars
+        if leds_per_bar == 0:
+            return colors
         
-        for bar in range(bars):
-            start_led = bar * leds_per_bar
-            end_led = min((bar + 1) * leds_per_bar, self.led_count)
-            
-            # Calculate bar intensity
-            bar_intensity = np.mean(led_data[start_led:end_led])
-            
-            # Color based on frequency range
-            if bar < 2:  # Bass
-                color = [bar_intensity * 255, 0, 0]  # Red
-            elif bar < 4:  # Mid
-                color = [0, bar_intensity * 255, 0]  # Green
-            else:  # Treble
-                color = [0, 0, bar_intensity * 255]  # Blue
-            
-            colors[start_led:end_led] = color
+        # Calculate all bar intensities at once
+        bar_leds = bars * leds_per_bar
+        bar_intensity = led_data[:bar_leds].reshape(bars, leds_per_bar).mean(axis=1)
+        
+        # Color based on frequency range: bass red, mid green, treble blue
+        bar_channel = np.array([0, 0, 1, 1, 2, 2, 2, 2])
+        colors[np.arange(bar_leds), np.repeat(bar_channel, leds_per_bar)] = \
+            np.repeat(bar_intensity * 255, leds_per_bar)
         
         return colors
     
@@ -347,13 +399,16 @@ class MusicVisualizer:
         if len(data) < window_size:
             return data
         
-        smoothed = np.zeros_like(data)
-        for i in range(len(data)):
-            start = max(0, i - window_size // 2)
-            end = min(len(data), i + window_size // 2 + 1)
-            smoothed[i] = np.mean(data[start:end])
+        # Boxcar moving average; edges average over the samples available
+        key = (window_size, len(data))
+        if key not in self._smoothing:
+            kernel = np.ones(2 * (window_size // 2) + 1)
+            counts = np.convolve(np.ones(len(data)), kernel, mode='same')
+            self._smoothing[key] = (kernel, counts)
+        kernel, counts = self._smoothing[key]
+        sums = np.convolve(data, kernel, mode='same')
         
-        return smoothed
+        return sums / counts
 
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Bulk pixel writes for rpi_ws281x strips, shared by the LED controller and
+the WS2812B test script
+"""
+
+import ctypes
+import numpy as np
+
+
+def map_led_buffer(strip, led_count):
+    """Map the rpi_ws281x channel's LED array for bulk writes, or None if unavailable"""
+    try:
+        import _rpi_ws281x as ws
+        leds = ws.ws2811_channel_t_leds_get(strip._channel)
+        return (ctypes.c_uint32 * led_count).from_address(int(leds))
+    except Exception:
+        return None
+
+
+def write_packed(strip, led_buffer, packed):
+    """Write packed 0xRRGGBB pixels (uint32 array) to the strip
+
+    Args:
+        strip: The PixelStrip, used pixel by pixel when there is no mapped buffer
+        led_buffer: Result of map_led_buffer for this strip
+        packed: One 0xRRGGBB value per LED
+    """
+    packed = np.ascontiguousarray(packed, dtype=np.uint32)
+    if led_buffer is not None:
+        # One copy straight into the driver's buffer
+        ctypes.memmove(led_buffer, packed.ctypes.data, packed.nbytes)
+        return
+    set_pixel_color = strip.setPixelColor
+    for i, color in enumerate(packed.tolist()):
+        set_pixel_color(i, color)
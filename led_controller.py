@@ -13,6 +13,8 @@ from dataclasses import dataclass
 from enum import Enum
 import numpy as np
 
+from led_buffer import map_led_buffer, write_packed
+
 try:
     from rpi_ws281x import PixelStrip, Color
 except ImportError:
@@ -39,6 +41,11 @@ except ImportError:
             pass
 
 
+# One period of the fade and breathing intensity curves, indexed by frame
+FADE_LUT = ((np.sin(np.arange(round(2 * math.pi / 0.1)) * 0.1) + 1) / 2).tolist()
+BREATH_LUT = ((np.sin(np.arange(round(2 * math.pi / 0.05)) * 0.05) + 1) / 2).tolist()
+
+
 class PatternType(Enum):
     SOLID = "solid"
     RAINBOW = "rainbow"
@@ -61,45 +68,59 @@ class ColorRGB:
         return (self.red, self.green, self.blue)
     
     def to_hex(self) -> str:
-        return f"#{self.red:02x}{self.green:02x}{self.blue:02x}"
+        return '#%06x' % ((self.red << 16) | (self.green << 8) | self.blue)
     
     @classmethod
     def from_hex(cls, hex_color: str) -> 'ColorRGB':
-        hex_color = hex_color.lstrip('#')
+        # Only the first six digits are read, so '#RRGGBBAA' ignores the alpha
+        digits = hex_color.lstrip('#')[:6]
+        # int() alone would also accept signs, '0x' and '_' in the digits
+        if len(digits) < 6 or not all(c in '0123456789abcdefABCDEF' for c in digits):
+            raise ValueError(f"Expected a hex color like '#RRGGBB', got {hex_color!r}")
+        value = int(digits, 16)
         return cls(
-            red=int(hex_color[0:2], 16),
-            green=int(hex_color[2:4], 16),
-            blue=int(hex_color[4:6], 16)
+            red=(value >> 16) & 0xFF,
+            green=(value >> 8) & 0xFF,
+            blue=value & 0xFF
         )
     
     @classmethod
     def from_hsv(cls, h: float, s: float, v: float) -> 'ColorRGB':
         """Convert HSV to RGB"""
-        h = h % 360
-        c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
-        m = v - c
-        
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
+        # Sextant index picks the (r, g, b) ordering of v, p, q, t
+        h6 = (h / 60.0) % 6
+        i = int(h6) % 6
+        f = h6 - int(h6)
+        p = v * (1 - s)
+        q = v * (1 - s * f)
+        t = v * (1 - s * (1 - f))
+        r, g, b = ((v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q))[i]
         
         return cls(
-            red=int((r + m) * 255),
-            green=int((g + m) * 255),
-            blue=int((b + m) * 255)
+            red=int(r * 255),
+            green=int(g * 255),
+            blue=int(b * 255)
         )
 
 
+def hsv_to_rgb_array(h: np.ndarray, s: float, v: float) -> np.ndarray:
+    """Convert an array of hues (degrees) to an (N, 3) uint8 RGB array"""
+    h6 = (np.asarray(h, dtype=np.float64) / 60.0) % 6
+    i = h6.astype(int) % 6
+    f = h6 - np.floor(h6)
+    p = np.full_like(f, v * (1 - s))
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1 - f))
+    v = np.full_like(f, v)
+    
+    # Same sextant table as ColorRGB.from_hsv, selected per element
+    r = np.choose(i, (v, q, p, p, t, v))
+    g = np.choose(i, (t, v, v, q, p, p))
+    b = np.choose(i, (p, p, t, v, v, q))
+    
+    return (np.stack([r, g, b], axis=1) * 255).astype(np.uint8)
+
+
 class LEDController:
     def __init__(self, led_count: int = 60, pin: int = 18, freq_hz: int = 800000, 
                  dma: int = 10, invert: bool = False, brightness: int = 255, 
@@ -122,11 +143,13 @@ class LEDController:
         self.current_pattern = PatternType.SOLID
         self.is_running = False
         self.animation_thread = None
+        self._stop_event = threading.Event()
         self.animation_speed = 1.0
         self.primary_color = ColorRGB(255, 0, 0)  # Red
         self.secondary_color = ColorRGB(0, 0, 255)  # Blue
         self.audio_data = None
         self.audio_callback = None
+        self._led_index = np.arange(led_count)
         
         # Initialize the LED strip
         try:
@@ -144,12 +167,18 @@ class LEDController:
         except Exception as e:
             print(f"Error initializing LED strip: {e}")
             self.strip = None
+        
+        self._led_buffer = map_led_buffer(self.strip, self.led_count)
+        # Last frame written to the strip and whether it still needs a show()
+        self._last_frame = None
+        self._needs_show = False
     
     def set_brightness(self, brightness: int):
         """Set LED strip brightness (0-255)"""
         self.brightness = max(0, min(255, brightness))
         if self.strip:
             self.strip.setBrightness(self.brightness)
+            self._needs_show = True
     
     def set_color(self, color: ColorRGB):
         """Set primary color"""
@@ -184,38 +213,69 @@ class LEDController:
             return
         
         self.is_running = True
-        self.animation_thread = threading.Thread(target=self._animation_loop, daemon=True)
+        # Each thread gets its own stop event so a stopped loop can't be revived
+        self._stop_event = threading.Event()
+        self.animation_thread = threading.Thread(target=self._animation_loop,
+                                                 args=(self._stop_event,), daemon=True)
         self.animation_thread.start()
     
     def stop_animation(self):
         """Stop the animation loop"""
         self.is_running = False
-        if self.animation_thread:
-            self.animation_thread.join()
+        self._stop_event.set()
+        # Joining from the animation thread itself (e.g. a callback) would deadlock
+        if self.animation_thread and self.animation_thread is not threading.current_thread():
+            self.animation_thread.join(timeout=1.0)
     
     def clear(self):
         """Turn off all LEDs"""
-        if self.strip:
-            for i in range(self.led_count):
-                self.strip.setPixelColor(i, Color.RGB(0, 0, 0))
-            self.strip.show()
+        self.set_all_pixels(ColorRGB(0, 0, 0))
     
     def set_pixel(self, index: int, color: ColorRGB):
         """Set individual pixel color"""
         if self.strip and 0 <= index < self.led_count:
             self.strip.setPixelColor(index, Color.RGB(color.red, color.green, color.blue))
+            # Single-pixel writes invalidate the cached frame
+            self._last_frame = None
+            self._needs_show = True
+    
+    def set_pixels(self, colors: np.ndarray):
+        """Set every pixel from an (N, 3) uint8 RGB array"""
+        if self.strip:
+            colors = colors.astype(np.uint32)
+            self._write_packed((colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2])
+    
+    def _write_packed(self, packed: np.ndarray):
+        """Write packed 0xRRGGBB pixels, skipping frames identical to the last one"""
+        frame = packed.tobytes()
+        if frame == self._last_frame:
+            return
+        self._last_frame = frame
+        self._needs_show = True
+        write_packed(self.strip, self._led_buffer, packed)
+    
+    def show(self):
+        """Push pending pixel changes to the strip"""
+        if self.strip and self._needs_show:
+            self.strip.show()
+            self._needs_show = False
+    
+    def _scaled_primary(self, intensity: np.ndarray) -> np.ndarray:
+        """Primary color scaled by a per-LED intensity, as an (N, 3) uint8 array"""
+        return np.multiply.outer(intensity, self.primary_color.to_tuple()).astype(np.uint8)
     
     def set_all_pixels(self, color: ColorRGB):
         """Set all pixels to the same color"""
         if self.strip:
-            for i in range(self.led_count):
-                self.strip.setPixelColor(i, Color.RGB(color.red, color.green, color.blue))
-            self.strip.show()
+            packed = Color.RGB(color.red, color.green, color.blue)
+            self._write_packed(np.full(self.led_count, packed, dtype=np.uint32))
+            self.show()
     
-    def _animation_loop(self):
+    def _animation_loop(self, stop_event: threading.Event):
         """Main animation loop"""
         frame = 0
-        while self.is_running:
+        next_frame = time.monotonic()
+        while not stop_event.is_set():
             try:
                 if self.current_pattern == PatternType.SOLID:
                     self._solid_pattern()
@@ -236,15 +296,23 @@ class LEDController:
                 elif self.current_pattern == PatternType.MUSIC:
                     self._music_pattern(frame)
                 
-                if self.strip:
-                    self.strip.show()
+                # Static patterns leave nothing to show between frames
+                self.show()
                 
                 frame += 1
-                time.sleep(0.05 / self.animation_speed)  # ~20 FPS base
+                # Sleep until a fixed deadline so render time doesn't lower the FPS
+                period = 0.05 / self.animation_speed  # ~20 FPS base
+                next_frame += period
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    stop_event.wait(delay)
+                elif delay < -period:
+                    # Fell more than a frame behind; resync instead of bursting
+                    next_frame = time.monotonic()
                 
             except Exception as e:
                 print(f"Animation error: {e}")
-                time.sleep(0.1)
+                stop_event.wait(0.1)
     
     def _solid_pattern(self):
         """Solid color pattern"""
@@ -252,100 +320,66 @@ class LEDController:
     
     def _rainbow_pattern(self, frame: int):
         """Rainbow pattern"""
-        for i in range(self.led_count):
-            hue = (i * 360 / self.led_count + frame * 2) % 360
-            color = ColorRGB.from_hsv(hue, 1.0, 1.0)
-            self.set_pixel(i, color)
+        hue = (np.arange(self.led_count) * 360 / self.led_count + frame * 2) % 360
+        self.set_pixels(hsv_to_rgb_array(hue, 1.0, 1.0))
     
     def _chase_pattern(self, frame: int):
         """Chase pattern"""
-        for i in range(self.led_count):
-            if (i + frame) % 3 == 0:
-                self.set_pixel(i, self.primary_color)
-            else:
-                self.set_pixel(i, ColorRGB(0, 0, 0))
+        lit = (self._led_index + frame) % 3 == 0
+        self.set_pixels(self._scaled_primary(lit.astype(float)))
     
     def _fade_pattern(self, frame: int):
         """Fade pattern"""
-        intensity = (math.sin(frame * 0.1) + 1) / 2
+        intensity = FADE_LUT[frame % len(FADE_LUT)]
+        primary = self.primary_color
         color = ColorRGB(
-            int(self.primary_color.red * intensity),
-            int(self.primary_color.green * intensity),
-            int(self.primary_color.blue * intensity)
+            int(primary.red * intensity),
+            int(primary.green * intensity),
+            int(primary.blue * intensity)
         )
         self.set_all_pixels(color)
     
     def _breathing_pattern(self, frame: int):
         """Breathing pattern"""
-        intensity = (math.sin(frame * 0.05) + 1) / 2
+        intensity = BREATH_LUT[frame % len(BREATH_LUT)]
+        primary = self.primary_color
         color = ColorRGB(
-            int(self.primary_color.red * intensity),
-            int(self.primary_color.green * intensity),
-            int(self.primary_color.blue * intensity)
+            int(primary.red * intensity),
+            int(primary.green * intensity),
+            int(primary.blue * intensity)
         )
         self.set_all_pixels(color)
     
     def _twinkle_pattern(self, frame: int):
         """Twinkle pattern"""
-        for i in range(self.led_count):
-            if (i + frame) % 10 == 0:
-                intensity = (math.sin(frame * 0.2 + i) + 1) / 2
-                color = ColorRGB(
-                    int(self.primary_color.red * intensity),
-                    int(self.primary_color.green * intensity),
-                    int(self.primary_color.blue * intensity)
-                )
-                self.set_pixel(i, color)
-            else:
-                self.set_pixel(i, ColorRGB(0, 0, 0))
+        i = self._led_index
+        intensity = np.where((i + frame) % 10 == 0, (np.sin(frame * 0.2 + i) + 1) / 2, 0.0)
+        self.set_pixels(self._scaled_primary(intensity))
     
     def _wave_pattern(self, frame: int):
         """Wave pattern"""
-        for i in range(self.led_count):
-            wave = math.sin((i + frame * 0.5) * 0.3) * 0.5 + 0.5
-            color = ColorRGB(
-                int(self.primary_color.red * wave),
-                int(self.primary_color.green * wave),
-                int(self.primary_color.blue * wave)
-            )
-            self.set_pixel(i, color)
+        wave = np.sin((self._led_index + frame * 0.5) * 0.3) * 0.5 + 0.5
+        self.set_pixels(self._scaled_primary(wave))
     
     def _fire_pattern(self, frame: int):
         """Fire pattern"""
-        for i in range(self.led_count):
-            # Simulate fire with random flickering
-            flicker = np.random.random()
-            if flicker > 0.3:
-                intensity = flicker
-                color = ColorRGB(
-                    int(255 * intensity),
-                    int(100 * intensity),
-                    int(20 * intensity)
-                )
-                self.set_pixel(i, color)
-            else:
-                self.set_pixel(i, ColorRGB(0, 0, 0))
+        # Simulate fire with random flickering
+        flicker = np.random.random(self.led_count)
+        intensity = np.where(flicker > 0.3, flicker, 0.0)
+        self.set_pixels(np.multiply.outer(intensity, (255, 100, 20)).astype(np.uint8))
     
     def _music_pattern(self, frame: int):
         """Music visualization pattern"""
         if self.audio_data is not None and len(self.audio_data) > 0:
             # Use audio data to create visualization
-            audio_intensity = np.mean(np.abs(self.audio_data))
-            color_intensity = min(1.0, audio_intensity * 10)
+            magnitudes = np.abs(np.asarray(self.audio_data, dtype=np.float64))
+            color_intensity = min(1.0, magnitudes.mean() * 10)
             
-            for i in range(self.led_count):
-                # Create frequency-based visualization
-                freq_bin = int((i / self.led_count) * len(self.audio_data))
-                if freq_bin < len(self.audio_data):
-                    freq_intensity = abs(self.audio_data[freq_bin])
-                    color = ColorRGB(
-                        int(self.primary_color.red * freq_intensity * color_intensity),
-                        int(self.primary_color.green * freq_intensity * color_intensity),
-                        int(self.primary_color.blue * freq_intensity * color_intensity)
-                    )
-                    self.set_pixel(i, color)
-                else:
-                    self.set_pixel(i, ColorRGB(0, 0, 0))
+            # Create frequency-based visualization, one sampled bin per LED
+            freq_bins = (self._led_index / self.led_count * len(magnitudes)).astype(int)
+            colors = np.multiply.outer(magnitudes[freq_bins] * color_intensity,
+                                       self.primary_color.to_tuple())
+            self.set_pixels(np.clip(colors, 0, 255).astype(np.uint8))
         else:
             # Fallback to rainbow if no audio data
             self._rainbow_pattern(frame)
@@ -377,6 +411,7 @@ class LEDController:
         self.stop_animation()
         self.clear()
         if self.strip:
+            self._led_buffer = None
             self.strip = None
 
 
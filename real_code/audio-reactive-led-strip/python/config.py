@@ -52,8 +52,8 @@ if DEVICE == 'pi-sk9822':
     """SPI bus number (usually 0 on Raspberry Pi)"""
     SPI_DEVICE = 0
     """SPI device number (usually 0)"""
-    SPI_SPEED_HZ = 4000000
-    """SPI clock speed in Hz (1MHz default, can go up to 4MHz for SK9822)"""
+    SPI_SPEED_HZ = 8000000
+    """SPI clock speed in Hz (8MHz default; drop to 4MHz or less if long wiring glitches)"""
     SK9822_BRIGHTNESS = 1
     # SK9822_BRIGHTNESS = 2
     """Global brightness for SK9822 LEDs (0-31, where 31 is maximum)"""
@@ -1,5 +1,6 @@
 from __future__ import print_function
 import numpy as np
+from scipy.ndimage import correlate1d, gaussian_filter1d
 import config
 import melbank
 
@@ -16,15 +17,39 @@ class ExpFilter:
 
     def update(self, value):
         if isinstance(self.value, (list, np.ndarray, tuple)):
-            alpha = value - self.value
-            alpha[alpha > 0.0] = self.alpha_rise
-            alpha[alpha <= 0.0] = self.alpha_decay
+            # float32 factors keep float32 filter states from being promoted
+            alpha = np.where(value > self.value, np.float32(self.alpha_rise),
+                             np.float32(self.alpha_decay))
         else:
             alpha = self.alpha_rise if value > self.value else self.alpha_decay
         self.value = alpha * value + (1.0 - alpha) * self.value
         return self.value
 
 
+class GaussianFilter1D:
+    """Gaussian blur along the last axis for signals of a fixed length
+
+    Equivalent to scipy's gaussian_filter1d (mode='reflect'), but the kernel
+    is computed once. Short signals are blurred with a precomputed dense
+    matrix; longer ones correlate with the cached kernel weights.
+    """
+    def __init__(self, size, sigma, dense_max_size=64):
+        self.size = size
+        self.sigma = sigma
+        radius = int(4.0 * sigma + 0.5)
+        impulse = np.zeros(2 * radius + 1)
+        impulse[radius] = 1.0
+        self.weights = gaussian_filter1d(impulse, sigma)
+        # Row j is the blurred j-th basis vector, so x @ matrix blurs x
+        self.matrix = (gaussian_filter1d(np.eye(size, dtype=np.float32), sigma)
+                       if size <= dense_max_size else None)
+
+    def __call__(self, x):
+        if self.matrix is not None:
+            return x @ self.matrix
+        return correlate1d(x, self.weights, axis=-1, mode='reflect')
+
+
 def rfft(data, window=None):
     window = 1.0 if window is None else window(len(data))
     ys = np.abs(np.fft.rfft(data * window))
@@ -47,6 +72,7 @@ def create_mel_bank():
                                                freq_max=config.MAX_FREQUENCY,
                                                num_fft_bands=samples,
                                                sample_rate=config.MIC_RATE)
+    mel_y = mel_y.astype(np.float32)
 samples = None
 mel_y = None
 mel_x = None
@@ -75,8 +75,7 @@ def _update_esp8266():
     p = _gamma[pixels] if config.SOFTWARE_GAMMA_CORRECTION else np.copy(pixels)
     MAX_PIXELS_PER_PACKET = 126
     # Pixel indices
-    idx = range(pixels.shape[1])
-    idx = [i for i in idx if not np.array_equal(p[:, i], _prev_pixels[:, i])]
+    idx = np.flatnonzero(np.any(p != _prev_pixels, axis=0))
     n_packets = len(idx) // MAX_PIXELS_PER_PACKET + 1
     idx = np.array_split(idx, n_packets)
     for packet_indices in idx:
@@ -110,11 +109,8 @@ def _update_pi():
     g = np.left_shift(p[1][:].astype(int), 16)
     b = p[2][:].astype(int)
     rgb = np.bitwise_or(np.bitwise_or(r, g), b)
-    # Update the pixels
-    for i in range(config.N_PIXELS):
-        # Ignore pixels if they haven't changed (saves bandwidth)
-        if np.array_equal(p[:, i], _prev_pixels[:, i]):
-            continue
+    # Update the pixels, ignoring those that haven't changed (saves bandwidth)
+    for i in np.flatnonzero(np.any(p != _prev_pixels, axis=0)):
         #strip._led_data[i] = rgb[i]
         strip._led_data[i] = int(rgb[i])
     _prev_pixels = np.copy(p)
@@ -18,7 +18,7 @@ except ImportError:
 class SK9822Controller:
     """Controller for SK9822/APA102 LED strips using SPI interface"""
     
-    def __init__(self, num_leds, spi_bus=0, spi_device=0, max_speed_hz=1000000, 
+    def __init__(self, num_leds, spi_bus=0, spi_device=0, max_speed_hz=8000000, 
                  brightness=31, software_gamma=True, max_transfer_bytes=None):
         """
         Initialize SK9822 LED controller
@@ -32,7 +32,9 @@ class SK9822Controller:
         spi_device : int
             SPI device number (usually 0)
         max_speed_hz : int
-            SPI clock speed in Hz (1MHz default, can go up to 4MHz)
+            SPI clock speed in Hz (8MHz default; SK9822 runs at 8MHz+, lower
+            it on long or noisy wiring. The Pi divides its core clock by an
+            even divisor, so the actual rate may be slightly below this)
         brightness : int
             Global brightness (0-31), default is maximum (31)
         software_gamma : bool
@@ -58,8 +60,16 @@ class SK9822Controller:
                                    if isinstance(max_transfer_bytes, int) and max_transfer_bytes > 0
                                    else self._detect_max_transfer_bytes())
         
-        # Previous pixel values for change detection
-        self._prev_pixels = np.tile(253, (3, num_leds))
+        # Preallocated SPI frame: 4-byte start frame, 4 bytes per LED and the
+        # end frame (max(4, (N + 15) // 16) ones + 4 zeros)
+        end_ones = max(4, (num_leds + 15) // 16)
+        self._frame = np.zeros(4 + 4 * num_leds + end_ones + 4, dtype=np.uint8)
+        self._frame[4 + 4 * num_leds:4 + 4 * num_leds + end_ones] = 0xFF
+        # (N, 4) view of the LED section: [brightness byte, B, G, R] per LED
+        self._leds = self._frame[4:4 + 4 * num_leds].reshape(num_leds, 4)
+        # uint8 copy of the last gamma table passed to update()
+        self._gamma_source = None
+        self._gamma = None
         
         print(f"SK9822 controller initialized: {num_leds} LEDs on SPI {spi_bus}.{spi_device} @ {max_speed_hz}Hz")
 
@@ -102,25 +112,22 @@ class SK9822Controller:
         
         Parameters
         ----------
-        led_data : list
-            Raw LED data (without start/end frames)
+        led_data : array_like
+            Raw LED data (without start/end frames), 4 bytes per LED
         """
-        data = []
-        # Start frame: 4 bytes of 0x00
-        data += [0x00, 0x00, 0x00, 0x00]
-        # LED data - ensure all values are Python ints, not numpy types
-        data += [int(x) for x in led_data]
-        # End frame: depends on number of LEDs
-        # Formula: max(4, (NUM_LEDS + 15) // 16) ones + 4 zeros
-        data += [0xFF] * max(4, (self.num_leds + 15) // 16) + [0x00, 0x00, 0x00, 0x00]
-
-        # Chunk transfers to avoid exceeding SPI driver's maximum transfer size
+        # Start and end frames are already in place in the preallocated frame
+        self._frame[4:4 + 4 * self.num_leds] = led_data
+        self._write_frame()
+    
+    def _write_frame(self):
+        """Write the preallocated frame to the strip via SPI"""
+        # writebytes2 reads the numpy buffer directly and skips the MISO read
         max_len = int(self.max_transfer_bytes)
-        if len(data) <= max_len:
-            self.spi.xfer2(data)
+        if len(self._frame) <= max_len:
+            self.spi.writebytes2(self._frame)
         else:
-            for start in range(0, len(data), max_len):
-                self.spi.xfer2(data[start:start + max_len])
+            for start in range(0, len(self._frame), max_len):
+                self.spi.writebytes2(self._frame[start:start + max_len])
     
     def update(self, pixels, gamma_table=None):
         """
@@ -136,36 +143,34 @@ class SK9822Controller:
         gamma_table : np.array, optional
             Gamma correction lookup table
         """
-        # Clip values to valid range and convert to int
-        pixels = np.clip(pixels, 0, 255).astype(int)
+        # Clip values to valid range and convert to bytes
+        pixels = np.clip(pixels, 0, 255).astype(np.uint8)
         
         # Apply gamma correction if enabled and table provided
         if self.software_gamma and gamma_table is not None:
-            p = gamma_table[pixels]
+            if gamma_table is not self._gamma_source:
+                # Keep a uint8 copy so the lookup yields bytes directly
+                self._gamma_source = gamma_table
+                self._gamma = np.asarray(gamma_table).astype(np.uint8)
+            p = self._gamma[pixels]
         else:
-            p = np.copy(pixels)
+            p = pixels
         
-        # Build LED data frame
-        # Initialize with all LEDs off at specified brightness
-        led_data = [int(0xE0 | self.brightness), 0x00, 0x00, 0x00] * self.num_leds
-        
-        # Set each LED
-        for i in range(self.num_leds):
-            # Only update if pixel changed (optimization)
-            if not np.array_equal(p[:, i], self._prev_pixels[:, i]):
-                r, g, b = int(p[0, i]), int(p[1, i]), int(p[2, i])
-                self.set_led(i, (r, g, b), self.brightness, led_data)
+        # Fill the LED section of the frame: [brightness, B, G, R] per LED
+        # Reversing the planar (R, G, B) rows and transposing gives per-LED
+        # B, G, R triples, written with one strided copy
+        self._leds[:, 0] = 0xE0 | self.brightness
+        self._leds[:, 1:] = p[::-1].T
         
         # Send to strip
-        self.send_data(led_data)
-        
-        # Update previous values
-        self._prev_pixels = np.copy(p)
+        self._write_frame()
     
     def clear(self):
         """Turn off all LEDs"""
-        led_data = [0xE0 | 1, 0x00, 0x00, 0x00] * self.num_leds
-        self.send_data(led_data)
+        # Reuses the frame's precomputed start/end frames
+        self._leds[:, 0] = 0xE0 | 1
+        self._leds[:, 1:] = 0
+        self._write_frame()
     
     def set_brightness(self, brightness):
         """
@@ -2,7 +2,7 @@ from __future__ import print_function
 from __future__ import division
 import time
 import numpy as np
-from scipy.ndimage.filters import gaussian_filter1d
+import scipy.fft
 import config
 import microphone
 import dsp
@@ -58,8 +58,12 @@ def memoize(function):
 
 
 @memoize
-def _normalized_linspace(size):
-    return np.linspace(0, 1, size)
+def _interpolation_weights(old_length, new_length):
+    """Neighbour indices and blend fractions for resizing old_length -> new_length"""
+    x = np.linspace(0, old_length - 1, new_length)
+    left = np.minimum(x.astype(int), max(old_length - 2, 0))
+    right = np.minimum(left + 1, old_length - 1)
+    return left, right, x - left
 
 
 def interpolate(y, new_length):
@@ -81,26 +85,56 @@ def interpolate(y, new_length):
     """
     if len(y) == new_length:
         return y
-    x_old = _normalized_linspace(len(y))
-    x_new = _normalized_linspace(new_length)
-    z = np.interp(x_new, x_old, y)
+    left, right, frac = _interpolation_weights(len(y), new_length)
+    z = y[left]
+    z += frac * (y[right] - z)
     return z
 
+# Shared full-strip output buffers, overwritten by every frame
+_mirrored = np.empty((3, 2 * (config.N_PIXELS // 2)), dtype=np.float32)
+_scrolled = np.empty_like(_mirrored)
+
+
+def _mirror(rgb):
+    """Mirror three half-strip channels about the center into _mirrored"""
+    half = len(rgb[0])
+    for out, channel in zip(_mirrored, rgb):
+        out[:half] = channel[::-1]
+        out[half:] = channel
+    return _mirrored
+
+
+def _mirror_scroll(rgb, shift):
+    """np.roll(_mirror(rgb), shift, axis=1) written into _scrolled"""
+    x = _mirror(rgb)
+    n = x.shape[1]
+    shift %= n
+    # A circular shift is two slice copies into the shared output
+    _scrolled[:, shift:] = x[:, :n - shift]
+    _scrolled[:, :shift] = x[:, n - shift:]
+    return _scrolled
+
 # ORIGINAL FILTERS:
-r_filt = dsp.ExpFilter(np.tile(0.01, config.N_PIXELS // 2),
+r_filt = dsp.ExpFilter(np.full(config.N_PIXELS // 2, 0.01, dtype=np.float32),
                        alpha_decay=0.2, alpha_rise=0.99)
-g_filt = dsp.ExpFilter(np.tile(0.01, config.N_PIXELS // 2),
+g_filt = dsp.ExpFilter(np.full(config.N_PIXELS // 2, 0.01, dtype=np.float32),
                        alpha_decay=0.05, alpha_rise=0.3)
-b_filt = dsp.ExpFilter(np.tile(0.01, config.N_PIXELS // 2),
+b_filt = dsp.ExpFilter(np.full(config.N_PIXELS // 2, 0.01, dtype=np.float32),
                        alpha_decay=0.1, alpha_rise=0.5)
-common_mode = dsp.ExpFilter(np.tile(0.01, config.N_PIXELS // 2),
+common_mode = dsp.ExpFilter(np.full(config.N_PIXELS // 2, 0.01, dtype=np.float32),
                        alpha_decay=0.99, alpha_rise=0.01)
-p_filt = dsp.ExpFilter(np.tile(1, (3, config.N_PIXELS // 2)),
+p_filt = dsp.ExpFilter(np.ones((3, config.N_PIXELS // 2), dtype=np.float32),
                        alpha_decay=0.1, alpha_rise=0.99)
-p = np.tile(1.0, (3, config.N_PIXELS // 2))
-gain = dsp.ExpFilter(np.tile(0.01, config.N_FFT_BINS),
+p = np.ones((3, config.N_PIXELS // 2), dtype=np.float32)
+gain = dsp.ExpFilter(np.full(config.N_FFT_BINS, 0.01, dtype=np.float32),
                      alpha_decay=0.001, alpha_rise=0.99)
 
+# Fixed-size Gaussian blurs, kernels computed once
+_scroll_blur = dsp.GaussianFilter1D(config.N_PIXELS // 2, sigma=0.2)
+_energy_blur = dsp.GaussianFilter1D(config.N_PIXELS // 2, sigma=4.0)
+_wavepulse_blur = dsp.GaussianFilter1D(config.N_PIXELS // 2, sigma=2.0)
+_mel_blur = dsp.GaussianFilter1D(config.N_FFT_BINS, sigma=1.0)
+
 # Make normalization fall faster so levels recover after loud parts
 # gain = dsp.ExpFilter(np.tile(0.01, config.N_FFT_BINS),
 #                      alpha_decay=0.05,  # was 0.001
@@ -127,6 +161,11 @@ gain = dsp.ExpFilter(np.tile(0.01, config.N_FFT_BINS),
 #                        alpha_rise=0.35)   # was 0.5
 
 
+# Start index and width of the low/mid/high thirds of the mel spectrum
+_band_starts = np.array([0, config.N_FFT_BINS // 3, 2 * config.N_FFT_BINS // 3])
+_band_sizes = np.diff(np.append(_band_starts, config.N_FFT_BINS))
+
+
 def visualize_scroll(y):
     """Effect that originates in the center and scrolls outwards"""
     global p
@@ -134,34 +173,29 @@ def visualize_scroll(y):
     gain.update(y)
     y /= gain.value
     y *= 255.0
-    r = int(np.max(y[:len(y) // 3]))
-    g = int(np.max(y[len(y) // 3: 2 * len(y) // 3]))
-    b = int(np.max(y[2 * len(y) // 3:]))
+    r, g, b = np.maximum.reduceat(y, _band_starts).astype(int)
     # Scrolling effect window
     p[:, 1:] = p[:, :-1]
     p *= 0.98
-    p = gaussian_filter1d(p, sigma=0.2)
+    p = _scroll_blur(p)
     # Create new color originating at the center
     p[0, 0] = r
     p[1, 0] = g
     p[2, 0] = b
     # Update the LED strip
-    return np.concatenate((p[:, ::-1], p), axis=1)
+    return _mirror(p)
 
 
 def visualize_energy(y):
     """Effect that expands from the center with increasing sound energy"""
     global p
-    y = np.copy(y)
     gain.update(y)
-    y /= gain.value
+    y = y / gain.value
     # Scale by the width of the LED strip
     y *= float((config.N_PIXELS // 2) - 1)
     # Map color channels according to energy in the different freq bands
     scale = 0.9
-    r = int(np.mean(y[:len(y) // 3]**scale))
-    g = int(np.mean(y[len(y) // 3: 2 * len(y) // 3]**scale))
-    b = int(np.mean(y[2 * len(y) // 3:]**scale))
+    r, g, b = (np.add.reduceat(y**scale, _band_starts) / _band_sizes).astype(int)
     # Assign color to different frequency regions
     p[0, :r] = 255.0
     p[0, r:] = 0.0
@@ -170,29 +204,27 @@ def visualize_energy(y):
     p[2, :b] = 255.0
     p[2, b:] = 0.0
     p_filt.update(p)
-    p = np.round(p_filt.value)
     # Apply substantial blur to smooth the edges
-    p[0, :] = gaussian_filter1d(p[0, :], sigma=4.0)
-    p[1, :] = gaussian_filter1d(p[1, :], sigma=4.0)
-    p[2, :] = gaussian_filter1d(p[2, :], sigma=4.0)
+    p = _energy_blur(np.round(p_filt.value))
     # Set the new pixel value
-    return np.concatenate((p[:, ::-1], p), axis=1)
+    return _mirror(p)
 
 
-_prev_spectrum = np.tile(0.01, config.N_PIXELS // 2)
+_prev_spectrum = np.full(config.N_PIXELS // 2, 0.01, dtype=np.float32)
 
 prev_scroll = 0
 def visualize_spectrum(y):
     """Effect that maps the Mel filterbank frequencies onto the LED strip"""
     global _prev_spectrum, prev_scroll
-    y = np.copy(interpolate(y, config.N_PIXELS // 2))
+    y = interpolate(y, config.N_PIXELS // 2)
     common_mode.update(y)
     diff = y - _prev_spectrum
-    _prev_spectrum = np.copy(y)
+    # y is never modified in place, so keeping a reference is enough
+    _prev_spectrum = y
     # Color channel mappings
     r = r_filt.update(y - common_mode.value)
     g = g_filt.update(np.abs(diff))
-    b = b_filt.update(np.copy(y) - common_mode.value)
+    b = b_filt.update(y - common_mode.value)
     
     
     # Reduce blue by scaling it down and applying the common mode subtraction
@@ -203,38 +235,56 @@ def visualize_spectrum(y):
     # g = g * 1.3
 
 
-    # Mirror the color channels for symmetric output
-    r = np.concatenate((r[::-1], r))
-    g = np.concatenate((g[::-1], g))
-    b = np.concatenate((b[::-1], b))
-    output = np.array([r, g,b]) * 255
+    # Mirror the color channels for symmetric output and scroll
     prev_scroll = (prev_scroll + 10) % config.N_PIXELS
-
-    return np.roll(output, axis=1, shift=prev_scroll)
+    output = _mirror_scroll((r, g, b), prev_scroll)
+    output *= 255
+    return output
 
 
-fft_plot_filter = dsp.ExpFilter(np.tile(1e-1, config.N_FFT_BINS),
+fft_plot_filter = dsp.ExpFilter(np.full(config.N_FFT_BINS, 1e-1, dtype=np.float32),
                          alpha_decay=0.5, alpha_rise=0.99)
 # mel_gain = dsp.ExpFilter(np.tile(1e-1, config.N_FFT_BINS),
 #                          alpha_decay=0.01, alpha_rise=0.99)
-mel_gain = dsp.ExpFilter(np.tile(1e-1, config.N_FFT_BINS),
+mel_gain = dsp.ExpFilter(np.full(config.N_FFT_BINS, 1e-1, dtype=np.float32),
                          alpha_decay=0.2, alpha_rise=0.99)
-mel_smoothing = dsp.ExpFilter(np.tile(1e-1, config.N_FFT_BINS),
+mel_smoothing = dsp.ExpFilter(np.full(config.N_FFT_BINS, 1e-1, dtype=np.float32),
                          alpha_decay=0.5, alpha_rise=0.99)
 volume = dsp.ExpFilter(config.MIN_VOLUME_THRESHOLD,
                        alpha_decay=0.02, alpha_rise=0.02)
-fft_window = np.hamming(int(config.MIC_RATE / config.FPS) * config.N_ROLLING_HISTORY)
+fft_window = np.hamming(int(config.MIC_RATE / config.FPS) * config.N_ROLLING_HISTORY).astype(np.float32)
+# Audio window zero-padded to the next power of two for the FFT
+_fft_padded = np.zeros(1 << int(np.ceil(np.log2(len(fft_window)))), dtype=np.float32)
 prev_fps_update = time.time()
 
 
+def mel_spectrum(y_data):
+    """Gain-normalized, smoothed Mel filterbank output for one audio window"""
+    # Transform audio input into the frequency domain. The window is written
+    # into the front of the zero-padded FFT buffer; the padding stays zero
+    N = len(y_data)
+    np.multiply(y_data, fft_window, out=_fft_padded[:N])
+    YS = np.abs(scipy.fft.rfft(_fft_padded)[:N // 2])
+    # Construct a Mel filterbank from the FFT data
+    mel = dsp.mel_y @ YS
+    # Scale data to values more suitable for visualization
+    np.square(mel, out=mel)
+    # Gain normalization
+    mel_gain.update(np.max(_mel_blur(mel)))
+    mel /= mel_gain.value
+    return mel_smoothing.update(mel)
+
+
 def microphone_update(audio_samples):
-    global y_roll, prev_rms, prev_exp, prev_fps_update
+    global _roll_head, prev_rms, prev_exp, prev_fps_update, _gui_frame
     # Normalize samples between 0 and 1
     y = audio_samples / 2.0**15
-    # Construct a rolling window of audio samples
-    y_roll[:-1] = y_roll[1:]
-    y_roll[-1, :] = np.copy(y)
-    y_data = np.concatenate(y_roll, axis=0).astype(np.float32)
+    # Construct a rolling window of audio samples: write the newest frame to
+    # both copies of its slot, then read the window as one slice
+    y_roll[_roll_head] = y
+    y_roll[_roll_head + config.N_ROLLING_HISTORY] = y
+    _roll_head = (_roll_head + 1) % config.N_ROLLING_HISTORY
+    y_data = y_roll[_roll_head:_roll_head + config.N_ROLLING_HISTORY].reshape(-1)
     
     vol = np.max(np.abs(y_data))
     if vol < config.MIN_VOLUME_THRESHOLD:
@@ -242,37 +292,26 @@ def microphone_update(audio_samples):
         led.pixels = np.tile(0, (3, config.N_PIXELS))
         led.update()
     else:
-        # Transform audio input into the frequency domain
-        N = len(y_data)
-        N_zeros = 2**int(np.ceil(np.log2(N))) - N
-        # Pad with zeros until the next power of two
-        y_data *= fft_window
-        y_padded = np.pad(y_data, (0, N_zeros), mode='constant')
-        YS = np.abs(np.fft.rfft(y_padded)[:N // 2])
-        # Construct a Mel filterbank from the FFT data
-        mel = np.atleast_2d(YS).T * dsp.mel_y.T
-        # Scale data to values more suitable for visualization
-        # mel = np.sum(mel, axis=0)
-        mel = np.sum(mel, axis=0)
-        mel = mel**2.0
-        # Gain normalization
-        mel_gain.update(np.max(gaussian_filter1d(mel, sigma=1.0)))
-        mel /= mel_gain.value
-        mel = mel_smoothing.update(mel)
+        mel = mel_spectrum(y_data)
         # Map filterbank output onto LED strip
         output = visualization_effect(mel)
         led.pixels = output
         led.update()
         if config.USE_GUI:
-            # Plot filterbank output
-            x = np.linspace(config.MIN_FREQUENCY, config.MAX_FREQUENCY, len(mel))
-            mel_curve.setData(x=x, y=fft_plot_filter.update(mel))
-            # Plot the color channels
-            r_curve.setData(y=led.pixels[0])
-            g_curve.setData(y=led.pixels[1])
-            b_curve.setData(y=led.pixels[2])
+            # Keep smoothing every frame, but only redraw on GUI frames
+            mel_plot = fft_plot_filter.update(mel)
+            if _gui_frame == 0:
+                # Plot filterbank output
+                x = np.linspace(config.MIN_FREQUENCY, config.MAX_FREQUENCY, len(mel))
+                mel_curve.setData(x=x, y=mel_plot)
+                # Plot the color channels
+                r_curve.setData(y=led.pixels[0])
+                g_curve.setData(y=led.pixels[1])
+                b_curve.setData(y=led.pixels[2])
     if config.USE_GUI:
-        app.processEvents()
+        if _gui_frame == 0:
+            app.processEvents()
+        _gui_frame = (_gui_frame + 1) % GUI_FRAME_INTERVAL
     
     if config.DISPLAY_FPS:
         fps = frames_per_second()
@@ -281,15 +320,29 @@ def microphone_update(audio_samples):
             print('FPS {:.0f} / {:.0f}'.format(fps, config.FPS))
 
 
+# Redraw the GUI plots once every this many audio frames
+GUI_FRAME_INTERVAL = 4
+_gui_frame = 0
+
 # Number of audio samples to read every time frame
 samples_per_frame = int(config.MIC_RATE / config.FPS)
 
-# Array containing the rolling audio sample window
-y_roll = np.random.rand(config.N_ROLLING_HISTORY, samples_per_frame) / 1e16
+# Array containing the rolling audio sample window. Frames live in a ring of
+# N_ROLLING_HISTORY slots stored twice back to back, so the window (oldest
+# to newest) is always the contiguous rows [_roll_head, _roll_head + N)
+y_roll = (np.random.rand(config.N_ROLLING_HISTORY, samples_per_frame) / 1e16).astype(np.float32)
+y_roll = np.concatenate((y_roll, y_roll))
+_roll_head = 0
 
 """Visualization effect to display on the LED strip"""
 
 # --- New Wave Pulse Visualizer ---
+# Constant color ramps across the half strip; red and green pre-scaled to 0-255
+_wave_gradient = np.linspace(0, 1, config.N_PIXELS // 2, dtype=np.float32)
+_wave_red = (1 - _wave_gradient) * 255
+_wave_green = _wave_gradient * 255
+_wave_phase = _wave_gradient * np.float32(np.pi)
+
 def visualize_wavepulse(y):
     """
     Creates a symmetric, colorful wave pulse effect that radiates from the center
@@ -297,51 +350,56 @@ def visualize_wavepulse(y):
     """
     global p
     # Normalize and scale input
-    y = np.copy(y)
     gain.update(y)
-    y /= gain.value
-    y = np.clip(y, 0, 1)
+    y = y / gain.value
+    np.clip(y, 0, 1, out=y)
     # Interpolate y to match half the LED count
     half_leds = config.N_PIXELS // 2
     y_interp = interpolate(y, half_leds)
-    gradient = np.linspace(0, 1, half_leds)
-    r = (y_interp * (1 - gradient)) * 255
-    g = (y_interp * gradient) * 255
-    b = (np.abs(np.sin(gradient * np.pi + np.sum(y_interp))) * y_interp) * 255
+    r = y_interp * _wave_red
+    g = y_interp * _wave_green
+    b = (np.abs(np.sin(_wave_phase + np.sum(y_interp))) * y_interp) * 255
     # Pulse effect: fade previous frame, add new pulse to left half
     p *= 0.85  # Fade tails
-    half_leds = config.N_PIXELS // 2
     p[0, :half_leds] += r
     p[1, :half_leds] += g
     p[2, :half_leds] += b
     # Smooth with Gaussian blur
-    p[0, :] = gaussian_filter1d(p[0, :], sigma=2.0)
-    p[1, :] = gaussian_filter1d(p[1, :], sigma=2.0)
-    p[2, :] = gaussian_filter1d(p[2, :], sigma=2.0)
+    p = _wavepulse_blur(p)
     # Mirror for symmetry
-    output = np.concatenate((p[:, ::-1], p), axis=1)
-    output = np.clip(output, 0, 255)
-    return output
+    output = _mirror(p)
+    return np.clip(output, 0, 255, out=output)
 
 from collections import deque
-_bass_env_filt = dsp.ExpFilter(np.array([0.1]), alpha_decay=0.2, alpha_rise=0.9)
-_level_filt   = dsp.ExpFilter(np.array([0.5]), alpha_decay=0.2, alpha_rise=0.8)
+_bass_env_filt = dsp.ExpFilter(np.array([0.1], dtype=np.float32), alpha_decay=0.2, alpha_rise=0.9)
+_level_filt   = dsp.ExpFilter(np.array([0.5], dtype=np.float32), alpha_decay=0.2, alpha_rise=0.8)
 _peak_hist    = deque(maxlen=30)  # ~0.5s at 60 FPS; for robust gain
 
+# Party gamma curve x ** (1 / 2) on 12-bit input, pre-scaled to 0-255
+_party_gamma = (np.linspace(0.0, 1.0, 4096) ** (1.0 / 2.0) * 255.0).astype(np.float32)
+
+def _percentile_95(values):
+    """np.percentile(values, 95) using a partial partition instead of a full sort"""
+    a = np.asarray(values)
+    pos = 0.95 * (len(a) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(a) - 1)
+    a = np.partition(a, (lo, hi))
+    return a[lo] + (pos - lo) * (a[hi] - a[lo])
+
 def visualize_party(y):
     """Party/rap visualizer – flicker-tamed, with adaptive visual floor (no fully-off LEDs)."""
     global _prev_spectrum, prev_scroll, _peak_hist
 
     # --- Resize to half strip & sanitize ---
     half = config.N_PIXELS // 2
-    y = np.copy(interpolate(y, half))
-    y = np.maximum(y, 0.0)
+    y = np.maximum(interpolate(y, half), 0.0)
 
     # --- Robust level estimate (prevents post-loudness dimming) ---
     _peak_hist.append(float(np.max(y)))
-    level_est = np.percentile(_peak_hist, 95) if _peak_hist else float(np.max(y))
+    level_est = _percentile_95(_peak_hist) if _peak_hist else float(np.max(y))
     lvl = float(_level_filt.update(np.array([level_est]))[0])
-    denom = np.clip(lvl, 0.20, 2.5)        # slightly higher floor & tighter top
+    denom = min(max(lvl, 0.20), 2.5)      # slightly higher floor & tighter top
     y = y / denom
 
     # --- Common-mode baseline (less subtraction so lows don't collapse) ---
@@ -351,9 +409,9 @@ def visualize_party(y):
     # --- Smoothed differencing for transients ---
     y_sm = 0.7 * y + 0.3 * np.roll(y, 1)
     if _prev_spectrum is None or len(_prev_spectrum) != len(y_sm):
-        _prev_spectrum = np.copy(y_sm)
+        _prev_spectrum = y_sm
     raw_diff = y_sm - _prev_spectrum
-    _prev_spectrum = np.copy(y_sm)
+    _prev_spectrum = y_sm
 
     # Deadband (ignore tiny jitter) + soft compression
     med = np.median(raw_diff)
@@ -373,9 +431,8 @@ def visualize_party(y):
     g_raw = 1.1 * transients
     g = g_filt.update(g_raw)
 
-    # Blue: stable body/air (slightly reduced)
-    smooth_y = 0.7 * y + 0.3 * np.roll(y, 1)
-    b = b_filt.update(smooth_y) * 0.9
+    # Blue: stable body/air (slightly reduced), reusing the smoothed spectrum
+    b = b_filt.update(y_sm) * 0.9
 
     # --- Balance ---
     r *= 1.25
@@ -388,25 +445,20 @@ def visualize_party(y):
     # --- Adaptive visual floor to avoid fully-off LEDs ---
     # Baseline rises a bit with average energy, but stays subtle.
     avg_level = float(np.mean(y))
-    visual_floor = np.clip(0.03 + 0.5 * avg_level, 0.03, 0.12)  # 3%..12%
+    visual_floor = min(max(0.03 + 0.5 * avg_level, 0.03), 0.12)  # 3%..12%
     rgb = np.vstack([r, g, b])
     rgb = np.clip(rgb, 0.0, 1.0)
 
     # Mix in the floor: rgb' = floor + (1 - floor)*rgb
     rgb = visual_floor + (1.0 - visual_floor) * rgb
 
-    # Gentle gamma (brightens lows; helps avoid off pixels)
-    rgb = np.clip(rgb, 0.0, 1.0) ** (1.0 / 2.0)
+    # Gentle gamma (brightens lows; helps avoid off pixels), scaled to 0-255
+    rgb = _party_gamma[(np.clip(rgb, 0.0, 1.0) * 4095.0 + 0.5).astype(np.intp)]
 
     # --- Mirror & scroll ---
-    r_m = np.concatenate((rgb[0, ::-1], rgb[0]))
-    g_m = np.concatenate((rgb[1, ::-1], rgb[1]))
-    b_m = np.concatenate((rgb[2, ::-1], rgb[2]))
-    output = np.array([r_m, g_m, b_m]) * 255.0
-
     # 1–2 px/frame is nice for party ambience
     prev_scroll = (prev_scroll + 1) % config.N_PIXELS
-    return np.roll(output, shift=prev_scroll, axis=1)
+    return _mirror_scroll(rgb, prev_scroll)
 
 # To use, set:
 # visualization_effect = visualize_wavepulse
@@ -4,6 +4,23 @@ Test script to find available audio devices and their supported sample rates
 """
 import pyaudio
 
+# Common sample rates to probe on every input device
+SAMPLE_RATES = [8000, 16000, 22050, 44100, 48000, 96000]
+
+
+def _try(p, device, rate):
+    """True if the device accepts mono 16-bit input at this rate"""
+    try:
+        return p.is_format_supported(
+            rate,
+            input_device=device,
+            input_channels=1,
+            input_format=pyaudio.paInt16
+        )
+    except ValueError:
+        return False
+
+
 def test_audio_devices():
     p = pyaudio.PyAudio()
     
@@ -11,8 +28,9 @@ def test_audio_devices():
     print("AUDIO DEVICES")
     print("=" * 60)
     
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
+    # Query every device once up front
+    infos = [p.get_device_info_by_index(i) for i in range(p.get_device_count())]
+    for i, info in enumerate(infos):
         print(f"\nDevice {i}: {info['name']}")
         print(f"  Max Input Channels: {info['maxInputChannels']}")
         print(f"  Max Output Channels: {info['maxOutputChannels']}")
@@ -23,21 +41,7 @@ def test_audio_devices():
             print(f"  ✓ This is an INPUT device (microphone/line-in)")
             
             # Test common sample rates
-            sample_rates = [8000, 16000, 22050, 44100, 48000, 96000]
-            supported = []
-            
-            for rate in sample_rates:
-                try:
-                    supported_test = p.is_format_supported(
-                        rate,
-                        input_device=i,
-                        input_channels=1,
-                        input_format=pyaudio.paInt16
-                    )
-                    if supported_test:
-                        supported.append(rate)
-                except ValueError:
-                    pass
+            supported = [rate for rate in SAMPLE_RATES if _try(p, i, rate)]
             
             if supported:
                 print(f"  Supported Sample Rates: {supported}")
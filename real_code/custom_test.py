@@ -1,13 +1,14 @@
 import spidev
 import time
-import math
+import numpy as np
 from gpiozero import Button
 import microphone
 
 spi = spidev.SpiDev()
 spi.open(0, 0)
+spi.max_speed_hz = 8_000_000
 # spi.max_speed_hz = 4_000_000
-spi.max_speed_hz = 1_000_000
+# spi.max_speed_hz = 1_000_000
 # spi.max_speed_hz = 500_000
 # spi.max_speed_hz = 100_000
 spi.mode = 0 
@@ -17,39 +18,33 @@ spi.lsbfirst = False
 NUM_LEDS = 300
 BRIGHTNESS = 1
 
+END_FRAME_LEN = max(4, (NUM_LEDS + 15) // 16)
+
+# Reusable SPI frame: start frame, 4 bytes per LED, end frame + 4 zeros.
+# Only the LED section is rewritten per frame.
+frame = np.zeros(4 + 4 * NUM_LEDS + END_FRAME_LEN + 4, dtype=np.uint8)
+frame[4 + 4 * NUM_LEDS:4 + 4 * NUM_LEDS + END_FRAME_LEN] = 0xFF
+frame_body = frame[4:4 + 4 * NUM_LEDS]
+frame_leds = frame_body.reshape(NUM_LEDS, 4)
+
 def set_all_to_color(r, g, b, brightness):
-    data = []
-    # Start frame
-    # data += [0x00, 0x00, 0x00, 0x00]
-    # Per LED frame 
-    for _ in range(NUM_LEDS):
-        data += [0xE0 | brightness, b, g, r]
-
-    # End frame
-    # data += [0xFF]
-    # data += [0x00] * int(5 + NUM_LEDS / 165 + NUM_LEDS / 5)
-    # data += [0xFF, 0xFF, 0xFF, 0xFF]
-    # data += [0xFF] * max(4, (NUM_LEDS + 15) // 16) + [0x00, 0x00, 0x00, 0x00]
-
-    send_data(data)
-
-    # spi.xfer2(data)
-
-def send_data(led_data):
-    data = []
-    data += [0x00, 0x00, 0x00, 0x00]
-    data += led_data
-    data += [0xFF] * max(4, (NUM_LEDS + 15) // 16) + [0x00, 0x00, 0x00, 0x00]
-    spi.xfer2(data)
+    # Per LED frame: [brightness, B, G, R]
+    frame_leds[:] = (0xE0 | brightness, b, g, r)
+    send_frame()
+
+def send_frame():
+    spi.writebytes2(frame)
 
 def set_led(index, color, brightness, dataframe):
     dataframe[index*4:index*4+4] = [0xE0 | brightness, color[2], color[1], color[0]]
 
 def crawl_led(color=(255, 0, 0), delay=0.05, brightness=BRIGHTNESS):
+    frame_leds[:] = (0xE0 | brightness, 0x00, 0x00, 0x00)
     for i in range(NUM_LEDS):
-        data = [0xE0 | brightness, 0x00, 0x00, 0x00] * NUM_LEDS 
-        set_led(i, color, brightness, data) 
-        send_data(data) 
+        if i > 0:
+            frame_leds[i - 1, 1:] = 0
+        set_led(i, color, brightness, frame_body)
+        send_frame()
         time.sleep(delay)
     
     # for i in range(NUM_LEDS):
@@ -67,20 +62,24 @@ def clear_all_leds():
     set_all_to_color(0, 0, 0, 1)
 
 
+# Rainbow colors for each 8-bit wheel position; columns are R, G, B with
+# the channels phase-shifted by 2 and 4 radians
+RAINBOW_LUT = ((np.sin(np.arange(256)[:, None] * 6.28318 / 256 + [0, 2, 4]) + 1)
+               * 127.5).astype(np.uint8)
+LED_INDEX = np.arange(NUM_LEDS)
+
 def rainbow_cycle(delay=0.01, brightness=BRIGHTNESS):
+    frame_leds[:, 0] = 0xE0 | brightness
     for j in range(0, 256 * 10, 10):  # 256 cycles of all colors on the wheel
         print(j)
-        data = [0x00] * 4 * NUM_LEDS
-        for i in range(NUM_LEDS):
-            # Calculate the color for each LED
-            idx = ((i+j) * 256 // NUM_LEDS)
-            r = int((math.sin(idx * 6.28318 / 256) + 1) * 127.5)
-            g = int((math.sin(idx * 6.28318 / 256 + 2) + 1) * 127.5)
-            b = int((math.sin(idx * 6.28318 / 256 + 4) + 1) * 127.5)
-
-            set_led(i, (r, g, b), brightness, data)
-
-        send_data(data)
+        # Wheel position of every LED, then one table lookup per channel
+        idx = ((LED_INDEX + j) * 256 // NUM_LEDS) & 0xFF
+        rgb = RAINBOW_LUT[idx]
+        frame_leds[:, 1] = rgb[:, 2]
+        frame_leds[:, 2] = rgb[:, 1]
+        frame_leds[:, 3] = rgb[:, 0]
+
+        send_frame()
         time.sleep(delay)
 
 
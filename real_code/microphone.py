@@ -12,13 +12,17 @@ def start_stream(callback):
                     rate=config.MIC_RATE,
                     input=True,
                     frames_per_buffer=frames_per_buffer)
+    # Reused for every block; callbacks must copy samples they keep
+    y = np.empty(frames_per_buffer, dtype=np.float32)
     overflows = 0
     prev_ovf_time = time.time()
     while True:
         try:
-            y = np.fromstring(stream.read(frames_per_buffer, exception_on_overflow=False), dtype=np.int16)
-            y = y.astype(np.float32)
-            stream.read(stream.get_read_available(), exception_on_overflow=False)
+            raw = stream.read(frames_per_buffer, exception_on_overflow=False)
+            np.copyto(y, np.frombuffer(raw, dtype=np.int16))
+            # Only drop audio when processing has fallen well behind
+            if stream.get_read_available() > 2 * frames_per_buffer:
+                stream.read(stream.get_read_available(), exception_on_overflow=False)
             callback(y)
         except IOError:
             overflows += 1
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Color helpers shared by the LED test scripts
+"""
+
+import numpy as np
+
+# Which of (c, x, 0) feeds R, G and B in each 60 degree sextant of the hue wheel
+_SEXTANT_CHANNELS = np.array([
+    [0, 1, 2],  #   0-60:  c, x, 0
+    [1, 0, 2],  #  60-120: x, c, 0
+    [2, 0, 1],  # 120-180: 0, c, x
+    [2, 1, 0],  # 180-240: 0, x, c
+    [1, 2, 0],  # 240-300: x, 0, c
+    [0, 2, 1],  # 300-360: c, 0, x
+])
+
+
+def hsv_to_rgb(h, s, v):
+    """Convert HSV to RGB
+
+    Args:
+        h: Hue in degrees (wrapped to 0-360)
+        s: Saturation 0-1
+        v: Value 0-1
+        Each may be a scalar or an array; they broadcast together.
+
+    Returns:
+        uint8 array of shape (..., 3) holding R, G, B (0-255)
+    """
+    h, s, v = np.broadcast_arrays(np.asarray(h, dtype=float) % 360, s, v)
+    c = v * s
+    x = c * (1 - np.abs((h / 60) % 2 - 1))
+    m = v - c
+
+    # Pick each channel from (c, x, 0) by sextant instead of an if/elif ladder
+    sextant = np.minimum((h // 60).astype(int), 5)
+    cx0 = np.stack([c, x, np.zeros_like(c)], axis=-1)
+    rgb = np.take_along_axis(cx0, _SEXTANT_CHANNELS[sextant], axis=-1)
+    rgb += m[..., None]
+    rgb *= 255
+    # Saturate instead of wrapping when s or v fall outside 0-1
+    return np.clip(rgb, 0, 255, out=rgb).astype(np.uint8)
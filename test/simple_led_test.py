@@ -4,8 +4,17 @@ Simple LED Strip Test Script
 Basic test to turn on LEDs with simple patterns
 """
 
+import os
+import sys
 import time
 import math
+import numpy as np
+
+from led_color import hsv_to_rgb
+
+# The bulk LED buffer helpers live next to led_controller.py in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from led_buffer import map_led_buffer, write_packed
 
 try:
     from rpi_ws281x import PixelStrip, Color
@@ -29,6 +38,11 @@ class SimpleLEDTest:
         self.led_count = led_count
         self.pin = pin
         self.brightness = brightness
+        # 8-bit rainbow hue of every LED (256 steps per turn) and the packed
+        # 0xRRGGBB color for each of those hues
+        self._hue_offsets = np.arange(led_count) * 256 // led_count
+        rgb = hsv_to_rgb(np.arange(256) * (360 / 256), 1.0, 1.0).astype(np.uint32)
+        self._hue_lut = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
         
         print(f"🔧 Initializing LED strip with {led_count} LEDs on GPIO {pin}")
         
@@ -44,6 +58,7 @@ class SimpleLEDTest:
                 channel=0
             )
             self.strip.begin()
+            self._led_buffer = map_led_buffer(self.strip, self.led_count)
             print("✅ LED strip initialized successfully")
             
         except Exception as e:
@@ -51,18 +66,23 @@ class SimpleLEDTest:
             print("Check your wiring and GPIO settings")
             exit(1)
     
+    def _write_packed(self, packed):
+        """Write packed 0xRRGGBB pixels (uint32 array) to the strip's LED buffer"""
+        write_packed(self.strip, self._led_buffer, packed)
+
+    def _fill(self, red, green, blue):
+        """Set every LED to one color without showing it"""
+        self._write_packed(np.full(self.led_count, (red << 16) | (green << 8) | blue, dtype=np.uint32))
+
     def clear_all(self):
         """Turn off all LEDs"""
-        for i in range(self.led_count):
-            self.strip.setPixelColor(i, Color.RGB(0, 0, 0))
+        self._fill(0, 0, 0)
         self.strip.show()
         print("🔴 All LEDs cleared")
     
     def solid_color(self, red, green, blue):
         """Set all LEDs to the same color"""
-        color = Color.RGB(red, green, blue)
-        for i in range(self.led_count):
-            self.strip.setPixelColor(i, color)
+        self._fill(red, green, blue)
         self.strip.show()
         print(f"🎨 Set all LEDs to RGB({red}, {green}, {blue})")
     
@@ -72,11 +92,10 @@ class SimpleLEDTest:
         start_time = time.time()
         
         while time.time() - start_time < duration:
-            for i in range(self.led_count):
-                # Create rainbow effect
-                hue = (i * 360 / self.led_count + time.time() * 50) % 360
-                rgb = self.hsv_to_rgb(hue, 1.0, 1.0)
-                self.strip.setPixelColor(i, Color.RGB(rgb[0], rgb[1], rgb[2]))
+            # Create rainbow effect for the whole strip at once: advance the
+            # 8-bit hues by 50 degrees per second and look up packed colors
+            phase = int(time.time() * (50 * 256 / 360))
+            self._write_packed(self._hue_lut[(self._hue_offsets + phase) & 0xFF])
             
             self.strip.show()
             time.sleep(0.05)  # 20 FPS
@@ -88,19 +107,25 @@ class SimpleLEDTest:
         print("🏃 Starting chase test...")
         start_time = time.time()
         position = 0
+        # Clear all LEDs once; each frame only touches the lit pixels
+        self._fill(0, 0, 0)
+        lit = []
         
         while time.time() - start_time < duration:
-            # Clear all LEDs
-            for i in range(self.led_count):
+            # Turn off the previous frame's pixels
+            for i in lit:
                 self.strip.setPixelColor(i, Color.RGB(0, 0, 0))
             
-            # Light up current position
+            # Light up current position, wrapping at the strip ends
+            next_pos = position + 1 if position < self.led_count - 1 else 0
+            prev_pos = position - 1 if position > 0 else self.led_count - 1
+            self.strip.setPixelColor(next_pos, Color.RGB(128, 0, 0))  # Dim red
+            self.strip.setPixelColor(prev_pos, Color.RGB(128, 0, 0))  # Dim red
             self.strip.setPixelColor(position, Color.RGB(255, 0, 0))  # Red
-            self.strip.setPixelColor((position + 1) % self.led_count, Color.RGB(128, 0, 0))  # Dim red
-            self.strip.setPixelColor((position - 1) % self.led_count, Color.RGB(128, 0, 0))  # Dim red
+            lit = [next_pos, prev_pos, position]
             
             self.strip.show()
-            position = (position + 1) % self.led_count
+            position = next_pos
             time.sleep(0.1)
         
         print("✅ Chase test completed")
@@ -115,8 +140,7 @@ class SimpleLEDTest:
             intensity = (math.sin(time.time() * 2) + 1) / 2  # 0 to 1
             brightness = int(255 * intensity)
             
-            for i in range(self.led_count):
-                self.strip.setPixelColor(i, Color.RGB(brightness, 0, brightness))  # Purple
+            self._fill(brightness, 0, brightness)  # Purple
             
             self.strip.show()
             time.sleep(0.05)
@@ -125,25 +149,7 @@ class SimpleLEDTest:
     
     def hsv_to_rgb(self, h, s, v):
         """Convert HSV to RGB"""
-        h = h % 360
-        c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
-        m = v - c
-        
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
-        
-        return (int((r + m) * 255), int((g + m) * 255), int((b + m) * 255))
+        return tuple(int(c) for c in hsv_to_rgb(h, s, v))
     
     def run_all_tests(self):
         """Run all basic tests"""
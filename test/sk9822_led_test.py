@@ -7,17 +7,27 @@ Requires both data and clock signals
 
 import time
 import math
-import spidev
+import numpy as np
+
+from led_color import hsv_to_rgb
 
 try:
+    import spidev
+    SPI_AVAILABLE = True
     print("✅ Using SPI interface for SK9822 LEDs")
 except ImportError:
     print("❌ SPI interface not available")
-    exit(1)
+    print("Install with: pip install spidev")
+    SPI_AVAILABLE = False
+
+# SK9822 brightness header byte for each 0-255 brightness: 0xE0 plus the top
+# 5 bits of the brightness
+_BRIGHTNESS_HEADER = (0xE0 | (np.arange(256) >> 3)).astype(np.uint8)
 
 
 class SK9822LEDTest:
-    def __init__(self, led_count=300, spi_bus=0, spi_device=0, brightness=30):
+    def __init__(self, led_count=300, spi_bus=0, spi_device=0, brightness=30,
+                 spi_speed_hz=8000000):
         """
         Initialize SK9822 LED test
         
@@ -26,21 +36,27 @@ class SK9822LEDTest:
             spi_bus: SPI bus number (default: 0)
             spi_device: SPI device number (default: 0)
             brightness: LED brightness 0-255 (default: 128)
+            spi_speed_hz: SPI clock in Hz (default: 8MHz; lower it, e.g. to
+                1MHz, for better signal integrity on long or noisy wiring)
         """
+        if not SPI_AVAILABLE:
+            raise RuntimeError("spidev is not installed. Cannot drive SK9822 LEDs.")
+        
         self.led_count = led_count
         self.brightness = brightness
         self.spi_bus = spi_bus
         self.spi_device = spi_device
         
         print(f"🔧 Initializing SK9822 LED strip with {led_count} LEDs")
-        print(f"   SPI Bus: {spi_bus}, Device: {spi_device}")
+        print(f"   SPI Bus: {spi_bus}, Device: {spi_device}, Speed: {spi_speed_hz}Hz")
         
         try:
             # Initialize SPI interface
             self.spi = spidev.SpiDev()
             self.spi.open(spi_bus, spi_device)
-            self.spi.max_speed_hz = 1000000  # 1MHz for better signal integrity on long strips
+            self.spi.max_speed_hz = spi_speed_hz
             self.spi.mode = 0b00  # SPI mode 0
+            self.spi.bits_per_word = 8  # Whole frame goes out as one byte stream
             print("✅ SPI interface initialized successfully")
             
         except Exception as e:
@@ -48,178 +64,184 @@ class SK9822LEDTest:
             print("Check your SPI settings and permissions")
             exit(1)
 
-    def _start_frame(self):
-        """Return the SK9822/APA102 start frame (32 zero bits)."""
-        return [0x00] * 4
+        # Reusable SPI frame: 32 zero bits of start frame, 4 bytes per LED and
+        # the end frame that latches data across the strip. Many
+        # implementations use (N+15)//16 dummy 0xFF bytes; zeros have proven
+        # more reliable on SK9822 variants. Only the LED section is rewritten.
+        end_len = max(4, (led_count + 15) // 16)
+        self._frame = np.zeros(4 + 4 * led_count + end_len, dtype=np.uint8)
+        # (N, 4) view of the LED section: [brightness, B, G, R] per LED
+        self._pixels = self._frame[4:4 + 4 * led_count].reshape(led_count, 4)
+        # Copy of the last frame sent, for skipping repeated animation frames
+        self._last_sent = np.zeros_like(self._frame)
+        # Full-saturation rainbow colors for 256 hues around the wheel, in
+        # the strip's BGR byte order
+        self._hue_lut = hsv_to_rgb(np.arange(256) * (360 / 256), 1.0, 1.0)[:, ::-1].copy()
 
-    def _end_frame(self):
-        """Return an appropriate end frame to latch data across the strip.
+        # spidev splits writes larger than its bufsiz into separate transfers,
+        # with a gap between them; warn so long strips can raise the limit
+        bufsiz = self._spidev_bufsiz()
+        if bufsiz is not None and len(self._frame) > bufsiz:
+            print(f"⚠️  Frame is {len(self._frame)} bytes but spidev bufsiz is {bufsiz}; "
+                  "it will be sent in several transfers")
+            print("   Raise it with: sudo modprobe -r spidev && sudo modprobe spidev bufsiz=65536")
 
-        Many implementations use (N+15)//16 dummy bytes. Using zeros here has
-        proven more reliable on SK9822 variants.
-        """
-        bytes_needed = max(4, (self.led_count + 15) // 16)
-        return [0x00] * bytes_needed
+    def _spidev_bufsiz(self):
+        """Return the spidev driver's maximum transfer size, or None if unknown."""
+        try:
+            with open('/sys/module/spidev/parameters/bufsiz', 'r') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _send_frame(self, skip_unchanged=False):
+        """Send the preallocated frame in a single SPI transfer.
 
-    def _send_data(self, data: list):
-        """Send a full frame in a single SPI transfer."""
-        self.spi.xfer2(data)
+        With skip_unchanged, a frame identical to the last one sent is not
+        re-sent; the strip keeps showing the latched data.
+        """
+        if skip_unchanged and np.array_equal(self._frame, self._last_sent):
+            return
+        # writebytes2 reads the numpy buffer directly and skips the MISO read
+        self.spi.writebytes2(self._frame)
+        self._last_sent[:] = self._frame
     
+    def _pace(self, period):
+        """Sleep until `period` seconds after the previous frame's deadline.
+
+        Deadlines come from time.monotonic(), so the frame rate does not drift
+        with the time spent building and sending each frame.
+        """
+        self._next_t += period
+        delay = self._next_t - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Running late: restart the schedule instead of bursting to catch up
+            self._next_t = time.monotonic()
+
     def clear_all(self):
         """Turn off all LEDs"""
-        # SK9822 requires start frame and a sufficiently long end frame
-        start_frame = self._start_frame()
-        end_frame = self._end_frame()
-        
-        # Create data for all LEDs (off)
-        led_data = []
-        for _ in range(self.led_count):
-            led_data.extend([0xE0, 0x00, 0x00, 0x00])  # Brightness=0, R=0, G=0, B=0
+        # All LEDs off: Brightness=0, R=0, G=0, B=0
+        self._pixels[:] = (0xE0, 0x00, 0x00, 0x00)
         
-        # Send start frame + LED data + end frame
-        data = start_frame + led_data + end_frame
-        
-        # Send once; then send a second time to double-latch off state
-        self._send_data(data)
-        time.sleep(0.001)
-        self._send_data(data)
+        # Send once; then send a second time to double-latch off state.
+        # writebytes2 blocks until the transfer is done, so no gap is needed
+        self._send_frame()
+        self._send_frame()
 
         print(f"🔴 All {self.led_count} LEDs cleared")
     
     def solid_color(self, red, green, blue):
         """Set all LEDs to the same color"""
-        start_frame = self._start_frame()
-        end_frame = self._end_frame()
-        
-        # Create data for all LEDs
-        led_data = []
-        for i in range(self.led_count):
-            # SK9822 format: [Brightness(5 bits) + 3 bits, Blue, Green, Red]
-            brightness_byte = 0xE0 | (self.brightness >> 3)  # Top 5 bits for brightness
-            led_data.extend([brightness_byte, blue, green, red])
-        
-        # Send start frame + LED data + end frame
-        data = start_frame + led_data + end_frame
+        # SK9822 format: [Brightness(5 bits) + 3 bits, Blue, Green, Red]
+        brightness_byte = _BRIGHTNESS_HEADER[self.brightness]  # Top 5 bits for brightness
+        self._pixels[:] = (brightness_byte, blue, green, red)
         
         # Debug: Print data size
-        print(f"📊 Sending {len(data)} bytes for {self.led_count} LEDs")
+        print(f"📊 Sending {len(self._frame)} bytes for {self.led_count} LEDs")
         
         # Send full frame in one transfer
-        self._send_data(data)
+        self._send_frame()
         
         print(f"🎨 Set all {self.led_count} LEDs to RGB({red}, {green}, {blue})")
     
     def rainbow_test(self, duration=5):
         """Simple rainbow pattern"""
         print(f"🌈 Starting rainbow test for {self.led_count} LEDs...")
-        start_time = time.time()
+        start_time = self._next_t = time.monotonic()
         
-        while time.time() - start_time < duration:
-            start_frame = self._start_frame()
-            end_frame = self._end_frame()
-            
-            led_data = []
-            for i in range(self.led_count):
-                # Create rainbow effect
-                hue = (i * 360 / self.led_count + time.time() * 50) % 360
-                rgb = self.hsv_to_rgb(hue, 1.0, 1.0)
-                
-                brightness_byte = 0xE0 | (self.brightness >> 3)
-                led_data.extend([brightness_byte, rgb[2], rgb[1], rgb[0]])  # BGR format
-            
-            data = start_frame + led_data + end_frame
+        self._pixels[:, 0] = _BRIGHTNESS_HEADER[self.brightness]
+        # Fixed-point hues: 0x10000 is one full turn of the color wheel
+        hue_offsets = (np.arange(self.led_count) * (0x10000 // self.led_count)).astype(np.uint16)
+        hue_rate = 0x10000 * 50 // 360  # 50 degrees per second
+        
+        while time.monotonic() - start_time < duration:
+            # Create rainbow effect for the whole strip at once: uint16
+            # addition wraps around the wheel and the top 8 bits pick the color
+            base = np.uint16(int((time.monotonic() - start_time) * hue_rate) & 0xFFFF)
+            self._pixels[:, 1:] = self._hue_lut[(hue_offsets + base) >> 8]
             
             # Send full frame in one transfer
-            self._send_data(data)
+            self._send_frame(skip_unchanged=True)
             
-            time.sleep(0.1)  # Slower for 300 LEDs
+            self._pace(0.1)  # Slower for 300 LEDs
         
         print("✅ Rainbow test completed")
     
     def chase_test(self, duration=5):
         """Simple chase pattern"""
         print(f"🏃 Starting chase test for {self.led_count} LEDs...")
-        start_time = time.time()
+        start_time = self._next_t = time.monotonic()
         position = 0
+        # Start from an all-off strip; each frame only touches the lit pixels
+        self._pixels[:] = (0xE0, 0x00, 0x00, 0x00)
+        lit = []
+        bright_red = (_BRIGHTNESS_HEADER[self.brightness], 0x00, 0x00, 0xFF)
+        dim_red = (_BRIGHTNESS_HEADER[self.brightness // 2], 0x00, 0x00, 0x80)
         
-        while time.time() - start_time < duration:
-            start_frame = self._start_frame()
-            end_frame = self._end_frame()
-            
-            led_data = []
-            for i in range(self.led_count):
-                if i == position:
-                    # Bright red at current position
-                    brightness_byte = 0xE0 | (self.brightness >> 3)
-                    led_data.extend([brightness_byte, 0x00, 0x00, 0xFF])  # Red
-                elif i == (position + 1) % self.led_count or i == (position - 1) % self.led_count:
-                    # Dim red at adjacent positions
-                    brightness_byte = 0xE0 | ((self.brightness // 2) >> 3)
-                    led_data.extend([brightness_byte, 0x00, 0x00, 0x80])  # Dim red
-                else:
-                    # Off
-                    led_data.extend([0xE0, 0x00, 0x00, 0x00])  # Off
-            
-            data = start_frame + led_data + end_frame
+        while time.monotonic() - start_time < duration:
+            # Turn off the previous frame's pixels
+            self._pixels[lit] = (0xE0, 0x00, 0x00, 0x00)
+            # Dim red at adjacent positions, wrapping at the strip ends
+            next_pos = position + 1 if position < self.led_count - 1 else 0
+            prev_pos = position - 1 if position > 0 else self.led_count - 1
+            adjacent = [next_pos, prev_pos]
+            self._pixels[adjacent] = dim_red
+            # Bright red at current position
+            self._pixels[position] = bright_red
+            lit = adjacent + [position]
             
             # Send full frame in one transfer
-            self._send_data(data)
+            self._send_frame()
             
-            position = (position + 1) % self.led_count
-            time.sleep(0.2)  # Slower for 300 LEDs
+            position = next_pos
+            self._pace(0.2)  # Slower for 300 LEDs
         
         print("✅ Chase test completed")
     
     def breathing_test(self, duration=5):
         """Breathing effect"""
         print(f"🫁 Starting breathing test for {self.led_count} LEDs...")
-        start_time = time.time()
+        # Brightness header over one breath (sin(2t), a period of pi seconds)
+        # in 1024 steps, indexed by elapsed monotonic nanoseconds
+        intensity = (np.sin(np.arange(1024) * (2 * np.pi / 1024)) + 1) / 2  # 0 to 1
+        headers = _BRIGHTNESS_HEADER[(self.brightness * intensity).astype(int)]
+        steps_per_ns = 1024 / (math.pi * 1e9)
+        start_ns = time.monotonic_ns()
         
-        while time.time() - start_time < duration:
-            # Breathing effect with sine wave
-            intensity = (math.sin(time.time() * 2) + 1) / 2  # 0 to 1
-            current_brightness = int(self.brightness * intensity)
-            
-            start_frame = self._start_frame()
-            end_frame = self._end_frame()
-            
-            led_data = []
-            for i in range(self.led_count):
-                brightness_byte = 0xE0 | (current_brightness >> 3)
-                led_data.extend([brightness_byte, 0xFF, 0x00, 0xFF])  # Purple
-            
-            data = start_frame + led_data + end_frame
+        start_time = self._next_t = time.monotonic()
+        self._pixels[:, 1:] = (0xFF, 0x00, 0xFF)  # Purple
+        
+        while time.monotonic() - start_time < duration:
+            # Breathing effect with sine wave; only the brightness header
+            # changes between frames
+            step = int((time.monotonic_ns() - start_ns) * steps_per_ns) & 1023
+            self._pixels[:, 0] = headers[step]
             
             # Send full frame in one transfer
-            self._send_data(data)
+            self._send_frame(skip_unchanged=True)
             
-            time.sleep(0.1)  # Slower for 300 LEDs
+            self._pace(0.1)  # Slower for 300 LEDs
         
         print("✅ Breathing test completed")
 
     def crawl_once(self, red=255, green=0, blue=0, delay_s=0.02):
         """Move a single lit pixel from start (index 0) to end and stop."""
         print(f"➡️  Crawling single pixel across {self.led_count} LEDs...")
-        start_frame = self._start_frame()
-        end_frame = self._end_frame()
-        brightness_byte = 0xE0 | (self.brightness >> 3)
+        brightness_byte = _BRIGHTNESS_HEADER[self.brightness]
+        self._next_t = time.monotonic()
 
         for position in range(self.led_count):
-            led_data = []
-            for i in range(self.led_count):
-                if i == position:
-                    # Lit pixel at current position (BGR order)
-                    led_data.extend([brightness_byte, blue, green, red])
-                else:
-                    # Off
-                    led_data.extend([0xE0, 0x00, 0x00, 0x00])
-
-            data = start_frame + led_data + end_frame
+            # Off
+            self._pixels[:] = (0xE0, 0x00, 0x00, 0x00)
+            # Lit pixel at current position (BGR order)
+            self._pixels[position] = (brightness_byte, blue, green, red)
 
             # Send full frame in one transfer
-            self._send_data(data)
+            self._send_frame()
 
-            time.sleep(delay_s)
+            self._pace(delay_s)
 
         print("✅ Crawl complete")
     
@@ -238,50 +260,36 @@ class SK9822LEDTest:
             - Color bytes are still sent at full intensity; only header level changes perceived brightness.
         """
         print(f"🔆 Brightness sweep on {self.led_count} LEDs (levels {min_level}..{max_level})")
-        start_frame = self._start_frame()
-        end_frame = self._end_frame()
+        up = range(min_level, max_level + 1, max(1, step))
+        down = range(max_level, min_level - 1, -max(1, step))
+
+        # The color is fixed, so build one frame per distinct level up front
+        # and just replay them. BGR order for SK9822
+        self._pixels[:, 1:] = (blue, green, red)
+        frames = {}
+        for lvl in set(up) | set(down):
+            self._pixels[:, 0] = 0xE0 | max(0, min(31, lvl))
+            frames[lvl] = self._frame.copy()
+        self._next_t = time.monotonic()
 
         def send_frame(level: int):
-            level = max(0, min(31, level))
-            brightness_byte = 0xE0 | level
-            led_data = []
-            for _ in range(self.led_count):
-                # BGR order for SK9822
-                led_data.extend([brightness_byte, blue, green, red])
-            data = start_frame + led_data + end_frame
-            self._send_data(data)
-            time.sleep(delay_s)
+            self.spi.writebytes2(frames[level])
+            # Keep _send_frame's skip_unchanged check in step with the strip
+            self._last_sent[:] = frames[level]
+            self._pace(delay_s)
 
         for _ in range(max(1, cycles)):
             # Up
-            for lvl in range(min_level, max_level + 1, max(1, step)):
+            for lvl in up:
                 send_frame(lvl)
             # Down
-            for lvl in range(max_level, min_level - 1, -max(1, step)):
+            for lvl in down:
                 send_frame(lvl)
         print("✅ Brightness sweep complete")
     
     def hsv_to_rgb(self, h, s, v):
         """Convert HSV to RGB"""
-        h = h % 360
-        c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
-        m = v - c
-        
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
-        
-        return (int((r + m) * 255), int((g + m) * 255), int((b + m) * 255))
+        return tuple(int(c) for c in hsv_to_rgb(h, s, v))
     
     def run_all_tests(self):
         """Run all basic tests"""
@@ -343,6 +351,7 @@ def main():
     LED_COUNT = 300     # Number of LEDs in your strip (change this to match your strip)
     SPI_BUS = 0         # SPI bus number (usually 0)
     SPI_DEVICE = 0      # SPI device number (usually 0)
+    SPI_SPEED_HZ = 8000000  # SPI clock; lower to 1000000 if the far end of the strip glitches
     # ~30% brightness on SK9822 header ≈ 0.3 * 255 ≈ 77
     BRIGHTNESS = 77     # Brightness (0-255) mapped to 5-bit header via >> 3
     COLOR = (255, 0, 0) # Solid red
@@ -351,13 +360,14 @@ def main():
     print(f"  LED Count: {LED_COUNT}")
     print(f"  SPI Bus: {SPI_BUS}")
     print(f"  SPI Device: {SPI_DEVICE}")
+    print(f"  SPI Speed: {SPI_SPEED_HZ}Hz")
     print(f"  Brightness: {BRIGHTNESS}")
     print(f"  Color: RGB{COLOR}")
     print()
     
     # Initialize and set solid color
     try:
-        led = SK9822LEDTest(LED_COUNT, SPI_BUS, SPI_DEVICE, BRIGHTNESS)
+        led = SK9822LEDTest(LED_COUNT, SPI_BUS, SPI_DEVICE, BRIGHTNESS, SPI_SPEED_HZ)
         led.solid_color(*COLOR)
         print("✅ Set to constant red at ~30% brightness. Press Ctrl+C to exit.")
         # Keep process alive so LEDs remain steady until user exits
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("pyaudio")
+
+import app as app_module
+from led_controller import ColorRGB
+
+
+class RecordingController:
+    """Stands in for LEDController, remembering the colors it was given"""
+
+    def __init__(self):
+        self.primary = None
+        self.secondary = None
+
+    def set_color(self, color):
+        self.primary = color
+
+    def set_secondary_color(self, color):
+        self.secondary = color
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    recorder = RecordingController()
+    monkeypatch.setattr(app_module, 'led_controller', recorder)
+    return recorder
+
+
+def test_color_endpoint_accepts_hex_with_alpha(controller):
+    client = app_module.app.test_client()
+
+    response = client.post('/api/color', json={'primary': {'hex': '#FF0000AA'},
+                                               'secondary': {'hex': '#00FF00'}})
+
+    assert response.status_code == 200
+    assert controller.primary == ColorRGB(255, 0, 0)
+    assert controller.secondary == ColorRGB(0, 255, 0)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pyaudio")
+
+from audio_processor import AudioProcessor
+
+
+def mask_band_levels(processor, fft_power):
+    """Per-LED band levels computed with one boolean mask per band"""
+    freqs = processor._freqs
+    edges = np.logspace(np.log10(20), np.log10(8000), processor.led_count + 1)
+    levels = np.zeros(processor.led_count)
+    for i in range(processor.led_count):
+        band_mask = (freqs >= edges[i]) & (freqs < edges[i + 1])
+        if np.any(band_mask):
+            levels[i] = np.sqrt(np.mean(fft_power[band_mask]))
+    return levels / levels.max()
+
+
+@pytest.mark.parametrize("sample_rate, chunk_size", [(16000, 512), (44100, 1024)])
+def test_led_bands_match_mask_reference(sample_rate, chunk_size):
+    processor = AudioProcessor(sample_rate=sample_rate, chunk_size=chunk_size, led_count=60)
+    rng = np.random.default_rng(0)
+    fft_power = rng.random(chunk_size // 2 + 1).astype(np.float32)
+
+    data = processor._create_visualization_data(fft_power, float(fft_power.sum()))
+
+    np.testing.assert_allclose(data['led_data'], mask_band_levels(processor, fft_power),
+                               rtol=1e-5, atol=1e-6)
+
+
+def test_stereo_chunks_are_downmixed():
+    processor = AudioProcessor(sample_rate=44100, chunk_size=1024, channels=2)
+    frames = []
+    processor.visualization_callback = frames.append
+    processor.is_running = True
+
+    t = np.arange(processor.chunk_size) / processor.sample_rate
+    mono = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    stereo = np.repeat(mono, 2)  # identical left/right samples, interleaved
+
+    processor._audio_callback(stereo.tobytes(), processor.chunk_size, None, 0)
+
+    assert frames
+    np.testing.assert_array_equal(processor.audio_buffer[0], mono)
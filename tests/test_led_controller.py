@@ -0,0 +1,18 @@
+import pytest
+
+from led_controller import ColorRGB
+
+
+def test_from_hex_parses_six_digit_colors():
+    assert ColorRGB.from_hex('#FF8000') == ColorRGB(255, 128, 0)
+    assert ColorRGB.from_hex('00ff7f') == ColorRGB(0, 255, 127)
+
+
+def test_from_hex_ignores_digits_past_the_sixth():
+    assert ColorRGB.from_hex('#FF0000AA') == ColorRGB(255, 0, 0)
+
+
+@pytest.mark.parametrize("hex_color", ['#fff', '', '0x1234', '-12345', '#GG0000'])
+def test_from_hex_rejects_malformed_colors(hex_color):
+    with pytest.raises(ValueError):
+        ColorRGB.from_hex(hex_color)